@@ -4,9 +4,111 @@ Visualization functions for cosmological power spectra
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.lines import Line2D
+
+# Color and linestyle for each known model; others are plotted gray and solid
+_STYLE_BY_MODEL = {
+    'ΛCDM': ('black', '-'),
+    'ΛCDM + Σmν=0.06 eV': ('cyan', '--'),
+    'ΛCDM + Σmν=0.10 eV': ('blue', '--'),
+    'wCDM (w0=-0.9)': ('red', '-.'),
+    'wCDM (w0=-1.1)': ('darkred', '-.'),
+    'Thermal WDM (all DM, m=3 keV)': ('green', ':'),
+    'CWDM (f_wdm=0.2, m=3 keV, g*=100)': ('orange', '--'),
+    'ETHOS IDM–DR (fiducial)': ('purple', '-.'),
+    'IDM–baryon (σ=1e-41 cm², n=-4)': ('brown', ':'),
+}
+_DEFAULT_STYLE = ('gray', '-')
+
+# Legend proxies built once, so legends need not introspect the plotted artists
+_LEGEND_HANDLES = {
+    name: Line2D([], [], color=color, linestyle=linestyle, linewidth=1.5, alpha=0.9,
+                 label=name)
+    for name, (color, linestyle) in _STYLE_BY_MODEL.items()
+}
+
+
+def _legend_handle(model_name):
+    """Legend proxy for a model, falling back to the default style."""
+    handle = _LEGEND_HANDLES.get(model_name)
+    if handle is None:
+        color, linestyle = _DEFAULT_STYLE
+        handle = Line2D([], [], color=color, linestyle=linestyle, linewidth=1.5, alpha=0.9,
+                        label=model_name)
+    return handle
+
+
+def _log_decimation_index(k, fig):
+    """
+    Index thinning a log-axis curve to about two points per horizontal pixel.
+
+    Returns slice(None) when k is already short enough to plot as-is, or when
+    it is not strictly positive and ascending, since log10 and searchsorted
+    would then collapse the curve.
+    """
+    npix = int(fig.get_size_inches()[0] * fig.dpi)
+    if len(k) <= 4 * npix:
+        return slice(None)
+    k = np.asarray(k)
+    if k[0] <= 0 or np.any(np.diff(k) <= 0):
+        return slice(None)
+    log_k = np.log10(k)
+    targets = np.linspace(log_k[0], log_k[-1], 2 * npix)
+    return np.unique(np.searchsorted(log_k, targets).clip(0, len(k) - 1))
+
+
+def _safe_ratio(num, den, out=None):
+    """
+    Elementwise num / den, NaN wherever den is not positive.
+
+    Matplotlib skips NaN points instead of clipping infinities on log axes.
+    ``out`` may alias ``den`` to reuse its buffer.
+    """
+    valid = den > 0
+    if out is None:
+        out = np.empty(np.broadcast(num, den).shape)
+    np.divide(num, den, out=out, where=valid)
+    np.copyto(out, np.nan, where=~valid)
+    return out
+
+
+def _model_lines(fig):
+    """
+    Map model name -> list of its Line2D artists, in axes order.
+
+    Model lines are tagged with gid=model_name when plotted. The mapping is
+    built on first use and cached on the figure.
+    """
+    lines = getattr(fig, '_model_lines', None)
+    if lines is None:
+        lines = {}
+        for ax in fig.axes:
+            for line in ax.get_lines():
+                if line.get_gid() is not None:
+                    lines.setdefault(line.get_gid(), []).append(line)
+        fig._model_lines = lines
+    return lines
+
+
+def _plot_obs_ratio(ax, k_theory, P_lcdm, k_obs, Pk_obs, σPk_obs):
+    """Draw the observations divided by ΛCDM interpolated to k_obs; returns the container."""
+    # Interpolate ΛCDM to observed k points
+    P_lcdm_interp = np.interp(k_obs, k_theory, P_lcdm)
+    ratio_obs = _safe_ratio(Pk_obs, P_lcdm_interp)
+    # P_lcdm_interp is a temporary, so reuse its buffer for the errors
+    ratio_obs_err = _safe_ratio(σPk_obs, P_lcdm_interp, out=P_lcdm_interp)
+
+    return ax.errorbar(k_obs, ratio_obs, yerr=ratio_obs_err,
+                       fmt='ko', markersize=5,
+                       alpha=0.8,
+                       capsize=3,
+                       markerfacecolor='none',
+                       markeredgewidth=1.5)
+
 
 def plot_power_spectra(k_theory, model_results, k_obs, Pk_obs, σPk_obs,
-                       save_path='plots/matter_power_spectrum_comparison.png'):
+                       save_path='plots/matter_power_spectrum_comparison.png',
+                       close_after_save=False):
     """
     Create plot comparing theoretical models with observations.
 
@@ -17,66 +119,55 @@ def plot_power_spectra(k_theory, model_results, k_obs, Pk_obs, σPk_obs,
         Pk_obs: P(k) values for observations
         σPk_obs: Errors on P(k) observations
         save_path: Path to save the figure
+        close_after_save: Close the figure once saved and return None. Set this
+            in parameter sweeps so figures do not pile up in pyplot's registry
     """
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(9, 10),
                                     gridspec_kw={'height_ratios': [2, 1], 'hspace': 0.05})
 
-    # Define colors for different model categories
-    colors = {
-        'ΛCDM': 'black',
-        'ΛCDM + Σmν=0.06 eV': 'cyan',
-        'ΛCDM + Σmν=0.10 eV': 'blue',
-        'wCDM (w0=-0.9)': 'red',
-        'wCDM (w0=-1.1)': 'darkred',
-        'Thermal WDM (all DM, m=3 keV)': 'green',
-        'CWDM (f_wdm=0.2, m=3 keV, g*=100)': 'orange',
-        'ETHOS IDM–DR (fiducial)': 'purple',
-        'IDM–baryon (σ=1e-41 cm², n=-4)': 'brown',
-    }
-
-    # Define linestyles for visual distinction
-    linestyles = {
-        'ΛCDM': '-',
-        'ΛCDM + Σmν=0.06 eV': '--',
-        'ΛCDM + Σmν=0.10 eV': '--',
-        'wCDM (w0=-0.9)': '-.',
-        'wCDM (w0=-1.1)': '-.',
-        'Thermal WDM (all DM, m=3 keV)': ':',
-        'CWDM (f_wdm=0.2, m=3 keV, g*=100)': '--',
-        'ETHOS IDM–DR (fiducial)': '-.',
-        'IDM–baryon (σ=1e-41 cm², n=-4)': ':',
-    }
+    # Lists (e.g. from MCP JSON) cannot take the decimation index below
+    k_theory = np.asarray(k_theory)
+    model_results = {name: np.asarray(Pk) for name, Pk in model_results.items()
+                     if Pk is not None}
 
     # Get ΛCDM for ratio
     P_lcdm = model_results.get('ΛCDM', None)
 
+    # Dense k grids carry more points than the figure has pixels; thin them,
+    # and keep the index so plot_power_spectra_update thins the same way
+    idx = _log_decimation_index(k_theory, fig)
+    fig._k_index = idx
+    k_plot = k_theory[idx]
+
     # ===== TOP PANEL: Power Spectrum =====
     # Plot theoretical predictions
+    handles = []
     for model_name, Pk_model in model_results.items():
-        if Pk_model is not None:
-            color = colors.get(model_name, 'gray')
-            linestyle = linestyles.get(model_name, '-')
-            ax1.loglog(k_theory, Pk_model,
-                      color=color,
-                      linestyle=linestyle,
-                      linewidth=1.5,
-                      label=model_name,
-                      alpha=0.9)
+        color, linestyle = _STYLE_BY_MODEL.get(model_name, _DEFAULT_STYLE)
+        ax1.loglog(k_plot, Pk_model[idx],
+                  color=color,
+                  linestyle=linestyle,
+                  linewidth=1.5,
+                  label=model_name,
+                  alpha=0.9,
+                  gid=model_name)
+        handles.append(_legend_handle(model_name))
 
     # Plot observational data
     if k_obs is not None and Pk_obs is not None:
-        ax1.errorbar(k_obs, Pk_obs, yerr=σPk_obs,
-                    fmt='ko', markersize=5,
-                    label='DR14 LyA forest',
-                    alpha=0.8,
-                    capsize=3,
-                    markerfacecolor='none',
-                    markeredgewidth=1.5)
+        obs = ax1.errorbar(k_obs, Pk_obs, yerr=σPk_obs,
+                           fmt='ko', markersize=5,
+                           label='DR14 LyA forest',
+                           alpha=0.8,
+                           capsize=3,
+                           markerfacecolor='none',
+                           markeredgewidth=1.5)
+        handles.append(obs)
 
     # Formatting top panel
     ax1.set_ylabel('P(k) [(Mpc/h)³]', fontsize='x-large')
     ax1.set_title('Matter Power Spectrum: Theory vs Observations', fontsize='x-large')
-    ax1.legend(loc='lower left', fontsize='medium', framealpha=0.95, ncol=1)
+    ax1.legend(handles=handles, loc='lower left', fontsize='medium', framealpha=0.95, ncol=1)
     ax1.set_xlim(1e-4, 20)
     ax1.set_ylim(1e0, 2e5)
     ax1.tick_params(labelbottom=False)
@@ -86,29 +177,21 @@ def plot_power_spectra(k_theory, model_results, k_obs, Pk_obs, σPk_obs,
     if P_lcdm is not None:
         # Plot model ratios
         for model_name, Pk_model in model_results.items():
-            if Pk_model is not None and model_name != 'ΛCDM':
-                color = colors.get(model_name, 'gray')
-                linestyle = linestyles.get(model_name, '-')
-                ratio = Pk_model / P_lcdm
-                ax2.semilogx(k_theory, ratio,
+            if model_name != 'ΛCDM':
+                color, linestyle = _STYLE_BY_MODEL.get(model_name, _DEFAULT_STYLE)
+                ratio = _safe_ratio(Pk_model[idx], P_lcdm[idx])
+                ax2.semilogx(k_plot, ratio,
                            color=color,
                            linestyle=linestyle,
                            linewidth=1.5,
-                           alpha=0.9)
+                           alpha=0.9,
+                           gid=model_name)
 
-        # Compute ΛCDM theory at observed k points for ratio
+        # Compute ΛCDM theory at observed k points for ratio; the inputs are
+        # kept so plot_power_spectra_update can redraw the points for a new ΛCDM
         if k_obs is not None and Pk_obs is not None:
-            # Interpolate ΛCDM to observed k points
-            P_lcdm_interp = np.interp(k_obs, k_theory, P_lcdm)
-            ratio_obs = Pk_obs / P_lcdm_interp
-            ratio_obs_err = σPk_obs / P_lcdm_interp
-
-            ax2.errorbar(k_obs, ratio_obs, yerr=ratio_obs_err,
-                        fmt='ko', markersize=5,
-                        alpha=0.8,
-                        capsize=3,
-                        markerfacecolor='none',
-                        markeredgewidth=1.5)
+            obs_ratio = _plot_obs_ratio(ax2, k_theory, P_lcdm, k_obs, Pk_obs, σPk_obs)
+            fig._obs_ratio = (obs_ratio, k_theory, k_obs, Pk_obs, σPk_obs)
 
         # Reference line at 1
         ax2.axhline(y=1, color='black', linestyle='-', linewidth=1.5, alpha=0.9)
@@ -120,18 +203,83 @@ def plot_power_spectra(k_theory, model_results, k_obs, Pk_obs, σPk_obs,
     ax2.set_ylim(0.0, 1.5)
     # ax2.grid(True, alpha=0.3, which='both')
 
-    plt.tight_layout()
-
     # Save figure if path provided
     if save_path is not None:
         plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        if close_after_save:
+            plt.close(fig)
+            return None
     # plt.show()
 
     return fig
 
 
+def plot_power_spectra_update(fig, model_results, save_path=None):
+    """
+    Update the model curves of a figure created by plot_power_spectra().
+
+    Only the y-data of the existing lines is replaced; axes, ticks, legend and
+    the observational points of the top panel are reused as-is. Updating ΛCDM
+    also recomputes every ratio line and redraws the observations in the ratio
+    panel against the new curve. Intended for parameter sweeps that produce
+    many figures differing only in the model P(k) arrays.
+
+    Args:
+        fig: Figure returned by plot_power_spectra()
+        model_results: Dictionary with model names and P(k) arrays, on the same
+            k grid as the original call. Every model must have been drawn
+            originally; call plot_power_spectra() again for a new model set.
+        save_path: Path to save the figure
+
+    Returns:
+        The updated figure
+
+    Raises:
+        ValueError: If a model is not in the original figure. No line is
+            updated in that case.
+    """
+    # Map model name -> [top panel line, ratio panel line]
+    lines = _model_lines(fig)
+    model_results = {name: np.asarray(Pk) for name, Pk in model_results.items()
+                     if Pk is not None}
+    missing = [name for name in model_results if name not in lines]
+    if missing:
+        raise ValueError(f"Models not in the original figure: {missing}. "
+                         f"Available models: {list(lines)}")
+
+    # Apply the same thinning as the original plot
+    idx = getattr(fig, '_k_index', slice(None))
+    for model_name, Pk_model in model_results.items():
+        lines[model_name][0].set_ydata(Pk_model[idx])
+
+    # Ratio panel is recomputed against the current ΛCDM curve; a new ΛCDM
+    # curve changes every ratio, not only those of the updated models
+    if 'ΛCDM' in lines:
+        P_lcdm = lines['ΛCDM'][0].get_ydata()
+        stale = lines if 'ΛCDM' in model_results else model_results
+        for model_name in stale:
+            model_lines = lines.get(model_name, ())
+            if len(model_lines) > 1:
+                model_lines[1].set_ydata(_safe_ratio(model_lines[0].get_ydata(), P_lcdm))
+
+    obs_ratio = getattr(fig, '_obs_ratio', None)
+    if 'ΛCDM' in model_results and obs_ratio is not None:
+        container, k_theory, k_obs, Pk_obs, σPk_obs = obs_ratio
+        container.remove()
+        container = _plot_obs_ratio(fig.axes[1], k_theory, model_results['ΛCDM'],
+                                    k_obs, Pk_obs, σPk_obs)
+        fig._obs_ratio = (container, k_theory, k_obs, Pk_obs, σPk_obs)
+
+    # Save figure if path provided
+    if save_path is not None:
+        fig.savefig(save_path, dpi=150, bbox_inches='tight')
+
+    return fig
+
+
 def plot_suppression_ratios(k_values, suppression_ratios, reference_model='ΛCDM',
-                           save_path='plots/power_spectrum_suppression.png'):
+                           save_path='plots/power_spectrum_suppression.png',
+                           close_after_save=False):
     """
     Plot power spectrum suppression relative to reference model.
     
@@ -140,8 +288,10 @@ def plot_suppression_ratios(k_values, suppression_ratios, reference_model='ΛCDM
         suppression_ratios: Dictionary with model names and suppression arrays
         reference_model: Name of the reference model
         save_path: Path to save the figure
+        close_after_save: Close the figure once saved and return None. Set this
+            in parameter sweeps so figures do not pile up in pyplot's registry
     """
-    plt.figure(figsize=(9, 7))
+    fig = plt.figure(figsize=(9, 7))
     
     # Define colors for different models
     colors = {
@@ -162,7 +312,8 @@ def plot_suppression_ratios(k_values, suppression_ratios, reference_model='ΛCDM
                     color=color, 
                     linewidth=1.5, 
                     label=model_name, 
-                    alpha=0.9)
+                    alpha=0.9,
+                    gid=model_name)
     
     # Add reference line at 1
     plt.axhline(y=1, color='black', linestyle='--', alpha=0.5, label=reference_model)
@@ -179,18 +330,59 @@ def plot_suppression_ratios(k_values, suppression_ratios, reference_model='ΛCDM
     plt.xlim(1e-3, 20)
     plt.ylim(0.3, 1.3)
     # plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    # Margins as converged by tight_layout, fixed to skip the solver
+    fig.subplots_adjust(left=0.081, right=0.983, top=0.945, bottom=0.095)
 
     # Save figure if path provided
     if save_path is not None:
         plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        if close_after_save:
+            plt.close(fig)
+            return None
     # plt.show()
 
-    return plt.gcf()
+    return fig
+
+
+def plot_suppression_ratios_update(fig, suppression_ratios, save_path=None):
+    """
+    Update the model curves of a figure created by plot_suppression_ratios().
+
+    The reference line, shaded suppression bands, axes and legend are kept;
+    only the y-data of the model lines is replaced.
+
+    Args:
+        fig: Figure returned by plot_suppression_ratios()
+        suppression_ratios: Dictionary with model names and suppression arrays, on
+            the same k grid as the original call. Every model must have been drawn
+            originally; call plot_suppression_ratios() again for a new model set.
+        save_path: Path to save the figure
+
+    Returns:
+        The updated figure
+
+    Raises:
+        ValueError: If a model is not in the original figure. No line is
+            updated in that case.
+    """
+    lines = _model_lines(fig)
+    missing = [name for name in suppression_ratios if name not in lines]
+    if missing:
+        raise ValueError(f"Models not in the original figure: {missing}. "
+                         f"Available models: {list(lines)}")
+    for model_name, ratio in suppression_ratios.items():
+        lines[model_name][0].set_ydata(ratio)
+
+    # Save figure if path provided
+    if save_path is not None:
+        fig.savefig(save_path, dpi=150, bbox_inches='tight')
+
+    return fig
 
 
 def plot_model_comparison_grid(k_values, model_results, reference_model='ΛCDM',
-                              save_path='plots/model_comparison_grid.png'):
+                              save_path='plots/model_comparison_grid.png',
+                              close_after_save=False):
     """
     Create a grid of subplots comparing each model to the reference.
     
@@ -199,6 +391,8 @@ def plot_model_comparison_grid(k_values, model_results, reference_model='ΛCDM',
         model_results: Dictionary with model names and P(k) arrays
         reference_model: Name of the reference model
         save_path: Path to save the figure
+        close_after_save: Close the figure once saved and return None. Set this
+            in parameter sweeps so figures do not pile up in pyplot's registry
     """
     # Filter out the reference model
     models_to_plot = {k: v for k, v in model_results.items() if k != reference_model}
@@ -211,31 +405,31 @@ def plot_model_comparison_grid(k_values, model_results, reference_model='ΛCDM',
     n_cols = 3
     n_rows = (n_models + n_cols - 1) // n_cols
     
-    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, 4*n_rows))
-    if n_rows == 1:
-        axes = axes.reshape(1, -1)
+    # Shared axes: ticks are computed once and the limits apply to every panel
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, 4*n_rows),
+                             sharex=True, sharey=True, squeeze=False)
     
-    # Get reference power spectrum
-    P_ref = model_results[reference_model]
+    # Ratios of all models to the reference power spectrum in one pass
+    P_ref = np.asarray(model_results[reference_model])
+    ratios = _safe_ratio(np.stack([np.asarray(Pk) for Pk in models_to_plot.values()]), P_ref)
     
     # Plot each model
-    for idx, (model_name, Pk) in enumerate(models_to_plot.items()):
-        row = idx // n_cols
-        col = idx % n_cols
-        ax = axes[row, col]
-        
-        # Plot ratio
-        ratio = Pk / P_ref
+    for idx, (model_name, ax, ratio) in enumerate(zip(models_to_plot, axes.flat, ratios)):
         ax.semilogx(k_values, ratio, 'b-', linewidth=2)
         ax.axhline(y=1, color='k', linestyle='--', alpha=0.5)
-        
-        # Formatting
-        ax.set_xlabel('k [h/Mpc]', fontsize='x-large')
-        ax.set_ylabel(f'P/P_{{{reference_model}}}', fontsize='x-large')
         ax.set_title(model_name, fontsize='x-large', wrap=True)
-        ax.set_xlim(1e-3, 20)
-        ax.set_ylim(0, 1.2)
         # ax.grid(True, alpha=0.3)
+        
+        # Label the outer panels only; the lowest panel of a column may sit
+        # above a hidden cell, so its tick labels are turned back on
+        if idx % n_cols == 0:
+            ax.set_ylabel(f'P/P_{{{reference_model}}}', fontsize='x-large')
+        if idx + n_cols >= n_models:
+            ax.set_xlabel('k [h/Mpc]', fontsize='x-large')
+            ax.xaxis.set_tick_params(labelbottom=True)
+    
+    axes[0, 0].set_xlim(1e-3, 20)
+    axes[0, 0].set_ylim(0, 1.2)
     
     # Hide empty subplots
     for idx in range(n_models, n_rows * n_cols):
@@ -244,11 +438,18 @@ def plot_model_comparison_grid(k_values, model_results, reference_model='ΛCDM',
         axes[row, col].set_visible(False)
     
     plt.suptitle(f'Model Comparisons Relative to {reference_model}', fontsize='x-large')
-    plt.tight_layout()
+    # Margins as converged by tight_layout (constant in inches, so scale with
+    # the number of rows), fixed to skip the solver
+    height = 4 * n_rows
+    fig.subplots_adjust(left=0.048, right=0.99, top=1 - 0.74 / height, bottom=0.67 / height,
+                        hspace=0.31, wspace=0.17)
 
     # Save figure if path provided
     if save_path is not None:
         plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        if close_after_save:
+            plt.close(fig)
+            return None
     # plt.show()
 
     return fig
@@ -256,7 +457,8 @@ def plot_model_comparison_grid(k_values, model_results, reference_model='ΛCDM',
 
 def plot_scale_dependent_effects(k_values, model_results, 
                                 k_markers=[0.01, 0.1, 1.0, 10.0],
-                                save_path='plots/scale_dependent_effects.png'):
+                                save_path='plots/scale_dependent_effects.png',
+                                close_after_save=False):
     """
     Visualize scale-dependent effects of different models.
     
@@ -265,6 +467,8 @@ def plot_scale_dependent_effects(k_values, model_results,
         model_results: Dictionary with model names and P(k) arrays
         k_markers: List of k values to mark
         save_path: Path to save the figure
+        close_after_save: Close the figure once saved and return None. Set this
+            in parameter sweeps so figures do not pile up in pyplot's registry
     """
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(9, 7))
     
@@ -305,9 +509,13 @@ def plot_scale_dependent_effects(k_values, model_results,
     ax2.set_title('Transfer Function', fontsize='x-large')
     # ax2.grid(True, alpha=0.3, which='both')
     
-    plt.tight_layout()
+    # Margins as converged by tight_layout, fixed to skip the solver
+    fig.subplots_adjust(left=0.093, right=0.983, top=0.945, bottom=0.095, hspace=0.244)
     if save_path is not None:
         plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        if close_after_save:
+            plt.close(fig)
+            return None
     # plt.show()
 
     return fig
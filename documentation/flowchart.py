@@ -1,603 +1,730 @@
-from graphviz import Digraph
-
-def abstract_architecture():
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+
+# Raster resolutions: the builders default to screen; the PNGs embedded in
+# the docs are rendered at print resolution. Vector formats ignore both.
+SCREEN_DPI = '96'
+PRINT_DPI = '300'
+
+# Font and box style names repeated across every diagram. These are PostScript
+# names: dot's core SVG renderer maps them to a sans-serif fallback and a bold
+# weight, which generic fontconfig names such as 'Sans Bold' do not get.
+FONT = 'Helvetica'
+FONT_BOLD = 'Helvetica-Bold'
+ROUNDED_FILLED = 'rounded,filled'
+
+# Colours used in more than one place; one-off fills and borders stay inline
+CLIENT_BLUE = '#5E92F3'
+PROTOCOL_BLUE = '#1565C0'
+PROTOCOL_DARK_BLUE = '#0D47A1'
+SERVER_GREEN = '#81C784'
+SERVER_TEXT_GREEN = '#1B5E20'
+AGENT_PURPLE = '#AB47BC'
+AGENT_BORDER_PURPLE = '#7B1FA2'
+AGENT_EDGE_PURPLE = '#6A1B9A'
+EXTERNAL_RED = '#C62828'
+EXTERNAL_DARK_RED = '#B71C1C'
+DARK_TEXT = '#424242'
+# Sub-agent task and reply edges in power_spectrum_agent_internals
+DATA_TEAL = '#00695C'
+PROCESSING_BLUE = '#0277BD'
+VISUALIZATION_PINK = '#AD1457'
+
+# Graph, node and edge attributes common to every diagram; each builder adds its
+# own direction, title, spacing, dpi and node font size
+GRAPH_DEFAULTS = MappingProxyType({
+    'fontsize': '20', 'fontname': FONT_BOLD, 'labelloc': 't',
+    'bgcolor': '#FAFAFA', 'pad': '0.1'})
+BOX_NODE = MappingProxyType({'shape': 'box', 'style': ROUNDED_FILLED, 'penwidth': '0'})
+EDGE_DEFAULTS = MappingProxyType({'fontname': FONT, 'fontsize': '12', 'arrowhead': 'vee'})
+
+# Shared node and edge styles, built once at import rather than per call and
+# read-only so the memoized DOT sources can never see them change. Nodes start from
+# BOX_NODE and the builder's font size, edges from EDGE_DEFAULTS (12pt label,
+# 'vee' arrowhead), so the styles only list departures.
+
+# abstract_architecture
+ABSTRACT_CLIENT_NODE = MappingProxyType({'fillcolor': CLIENT_BLUE, 'fontcolor': 'white'})
+ABSTRACT_SERVER_NODE = MappingProxyType({
+    'fillcolor': SERVER_GREEN, 'fontcolor': SERVER_TEXT_GREEN})
+ABSTRACT_DOMAIN_NODE = MappingProxyType({
+    'fillcolor': '#FFB74D', 'fontcolor': DARK_TEXT, 'fontsize': '13'})
+ABSTRACT_AGENT_NODE = MappingProxyType({
+    'fillcolor': AGENT_PURPLE, 'fontcolor': 'white', 'fontsize': '13'})
+# Overrides ABSTRACT_AGENT_NODE for the placeholder node
+ABSTRACT_MORE_AGENTS_NODE = MappingProxyType({
+    'style': 'rounded,dashed,filled', 'fillcolor': '#E1BEE7', 'fontcolor': '#4A148C',
+    'penwidth': '1.5', 'color': AGENT_BORDER_PURPLE})
+ABSTRACT_CORE_NODE = MappingProxyType({
+    'fillcolor': '#ECEFF1', 'fontcolor': '#37474F', 'fontsize': '13'})
+ABSTRACT_EXTERNAL_NODE = MappingProxyType({
+    'shape': 'ellipse', 'style': 'filled', 'fillcolor': '#FFCDD2',
+    'fontcolor': EXTERNAL_DARK_RED, 'fontsize': '13'})
+ABSTRACT_PROTOCOL_EDGE = MappingProxyType({'color': PROTOCOL_BLUE, 'penwidth': '3'})
+ABSTRACT_TOOL_EDGE = MappingProxyType({'color': '#558B2F', 'penwidth': '2'})
+ABSTRACT_AGENT_EDGE = MappingProxyType({'color': AGENT_EDGE_PURPLE, 'penwidth': '2'})
+ABSTRACT_MORE_AGENTS_EDGE = MappingProxyType({
+    'style': 'dashed', 'color': AGENT_EDGE_PURPLE, 'penwidth': '1.5'})
+ABSTRACT_USES_EDGE = MappingProxyType({
+    'style': 'dashed', 'fontsize': '11', 'color': '#757575', 'penwidth': '1',
+    'arrowhead': 'open'})
+ABSTRACT_EXTERNAL_EDGE = MappingProxyType({
+    'style': 'dashed', 'fontsize': '11', 'color': EXTERNAL_RED, 'penwidth': '1',
+    'arrowhead': 'open'})
+
+# Fan-out targets of the server hub
+ABSTRACT_TOOL_IDS = ('data_cat', 'model_cat', 'analysis_cat', 'viz_cat', 'util_cat')
+ABSTRACT_AGENT_IDS = ('agent1', 'agent2')
+
+# mcp_overview
+OVERVIEW_CLIENT_NODE = MappingProxyType({
+    'fillcolor': CLIENT_BLUE, 'fontcolor': 'white', 'fontsize': '14'})
+OVERVIEW_SERVER_NODE = MappingProxyType({
+    'fillcolor': SERVER_GREEN, 'fontcolor': SERVER_TEXT_GREEN})
+OVERVIEW_DOMAIN_NODE = MappingProxyType({
+    'fillcolor': '#FFCA28', 'fontcolor': DARK_TEXT, 'fontsize': '12'})
+OVERVIEW_AGENT_NODE = MappingProxyType({
+    'fillcolor': AGENT_PURPLE, 'fontcolor': 'white', 'fontsize': '12'})
+OVERVIEW_CORE_NODE = MappingProxyType({
+    'fillcolor': '#CFD8DC', 'fontcolor': '#263238', 'fontsize': '12'})
+OVERVIEW_EXTERNAL_NODE = MappingProxyType({
+    'shape': 'ellipse', 'style': 'filled', 'fillcolor': '#FFEBEE',
+    'fontcolor': EXTERNAL_RED, 'fontsize': '12'})
+OVERVIEW_PROTOCOL_EDGE = MappingProxyType({'color': PROTOCOL_DARK_BLUE, 'penwidth': '2.5'})
+OVERVIEW_TOOL_EDGE = MappingProxyType({'color': '#2E7D32', 'penwidth': '2'})
+OVERVIEW_AGENT_EDGE = MappingProxyType({'color': '#4527A0', 'penwidth': '2'})
+OVERVIEW_USES_EDGE = MappingProxyType({
+    'style': 'dashed', 'fontsize': '11', 'color': '#607D8B', 'penwidth': '1',
+    'arrowhead': 'open'})
+OVERVIEW_EXTERNAL_EDGE = MappingProxyType({
+    'style': 'dashed', 'fontsize': '11', 'color': EXTERNAL_DARK_RED, 'penwidth': '1',
+    'arrowhead': 'open'})
+
+# Fan-out targets of the server hub, and the tools that call into codes/
+OVERVIEW_TOOL_IDS = ('t1', 't2', 't3', 't4', 't5')
+OVERVIEW_AGENT_IDS = ('a1', 'a2')
+OVERVIEW_CODES_USERS = ('t1', 't2', 't3', 't4')
+
+# power_spectrum_agent_internals node overrides; fill colour varies per node
+FLOW_ENDPOINT = MappingProxyType({'fontsize': '16'})
+FLOW_SUB_AGENT = MappingProxyType({'fontsize': '13'})
+NO_OVERRIDES = MappingProxyType({})
+
+# (id, label, fillcolor, overrides of the node defaults), top to bottom
+FLOW_NODES = (
+    ('client', 'MCP Client', CLIENT_BLUE, FLOW_ENDPOINT),  # Lighter blue
+    ('agent_tool', 'Agent Tool\n(e.g., power_spectrum_agent)',
+     AGENT_PURPLE, NO_OVERRIDES),  # Lighter purple
+    ('orchestrator', 'Orchestrator Agent\n\nCoordinates sub-agents\nManages dataflow',
+     '#FF8A65', NO_OVERRIDES),  # Lighter orange
+    # Sub-agents in a row
+    ('agent1', 'Sub-Agent 1\n\nData Loading', '#4DB6AC', FLOW_SUB_AGENT),  # Lighter teal
+    ('agent2', 'Sub-Agent 2\n\nProcessing', '#64B5F6', FLOW_SUB_AGENT),  # Lighter blue
+    ('agent3', 'Sub-Agent 3\n\nVisualization', '#F06292', FLOW_SUB_AGENT),  # Lighter pink
+    ('results', 'Results', '#FDD835',
+     MappingProxyType({'fontcolor': DARK_TEXT, 'fontsize': '16'})),
+)
+
+# Edge styles; label and line share one colour per edge
+FLOW_ENDPOINT_EDGE = MappingProxyType({'penwidth': '2.5'})
+FLOW_STEP_EDGE = MappingProxyType({'penwidth': '2'})
+FLOW_TASK_EDGE = MappingProxyType({'fontsize': '11', 'penwidth': '1.5'})
+FLOW_REPLY_EDGE = MappingProxyType({'fontsize': '11', 'penwidth': '1.5', 'style': 'dashed'})
+
+# (tail, head, label, color, style) in step order; each task is followed by
+# its sub-agent's reply
+FLOW_EDGES = (
+    ('client', 'agent_tool', '1. Query', PROTOCOL_DARK_BLUE, FLOW_ENDPOINT_EDGE),
+    ('agent_tool', 'orchestrator', '2. Initialize', AGENT_EDGE_PURPLE, FLOW_STEP_EDGE),
+    ('orchestrator', 'agent1', '3. Task 1', DATA_TEAL, FLOW_TASK_EDGE),
+    ('agent1', 'orchestrator', 'Data', DATA_TEAL, FLOW_REPLY_EDGE),
+    ('orchestrator', 'agent2', '4. Task 2', PROCESSING_BLUE, FLOW_TASK_EDGE),
+    ('agent2', 'orchestrator', 'Results', PROCESSING_BLUE, FLOW_REPLY_EDGE),
+    ('orchestrator', 'agent3', '5. Task 3', VISUALIZATION_PINK, FLOW_TASK_EDGE),
+    ('agent3', 'orchestrator', 'Outputs', VISUALIZATION_PINK, FLOW_REPLY_EDGE),
+    ('orchestrator', 'results', '6. Assemble', '#E65100', FLOW_STEP_EDGE),
+    ('results', 'client', '7. Return', PROTOCOL_DARK_BLUE, FLOW_ENDPOINT_EDGE),
+)
+
+
+def _build_overview(name, title, *, nodesep, ranksep, node_fontsize, clusters, nodes,
+                    edges, dpi):
     """
-    High-level abstract architecture - generic and extensible view.
-    Shows MCP-KE as a tool server pattern without specific implementation details.
+    Build the client/server/tools/core/external layout shared by
+    :func:`abstract_architecture` and :func:`mcp_overview`.
+
+    Args:
+        name: Graph name
+        title: Graph label shown at the top
+        nodesep, ranksep: Graph spacing
+        node_fontsize: Default node font size
+        clusters: Dict of cluster key -> (label, fillcolor, border color) for the
+            keys 'client', 'server', 'domain', 'agent', 'core' and 'external';
+            fillcolor is ignored for the dashed 'core' and 'external' clusters
+        nodes: Dict of the same cluster keys -> (node style, list of (id, label)
+            pairs); the style becomes the cluster's node default, and an
+            optional third tuple item overrides it for that node
+        edges: List of (edge style, list of (tail, head) pairs) groups; an
+            optional third tuple item is that edge's label
+        dpi: Output resolution for raster formats
     """
-    dot = Digraph('Abstract_Architecture')
-    dot.attr(rankdir='LR', 
-             fontsize='20',
-             fontname='Helvetica-Bold',
-             labelloc='t',
-             label='MCP-KE: Tool Server Pattern',
-             bgcolor='#FAFAFA',
-             pad='0.1',
-             nodesep='0.2',
-             ranksep='0.3',
-             dpi='300')
-    
-    # Set default node attributes
-    dot.node_attr.update(fontname='Helvetica', fontsize='14')
-    dot.edge_attr.update(fontname='Helvetica', fontsize='12')
+    from graphviz import Digraph
+
+    dot = Digraph(name, engine='dot')
+    dot.attr(rankdir='LR',
+             label=title,
+             nodesep=nodesep,
+             ranksep=ranksep,
+             dpi=dpi,
+             **GRAPH_DEFAULTS)
+
+    # Set default node and edge attributes
+    dot.node_attr.update(fontname=FONT, fontsize=node_fontsize, **BOX_NODE)
+    dot.edge_attr.update(EDGE_DEFAULTS)
+
+    def add_nodes(graph, key):
+        style, entries = nodes[key]
+        graph.attr('node', **style)
+        for node_id, label, *override in entries:
+            graph.node(node_id, label, **(override[0] if override else {}))
+
+    def filled_cluster(graph, key, penwidth, fontsize):
+        label, fillcolor, color = clusters[key]
+        graph.attr(label=label,
+                   style=ROUNDED_FILLED,
+                   fillcolor=fillcolor,
+                   color=color,
+                   penwidth=penwidth,
+                   fontsize=fontsize,
+                   fontname=FONT_BOLD)
+
+    def dashed_cluster(graph, key):
+        label, _, color = clusters[key]
+        graph.attr(label=label,
+                   style='dashed,rounded',
+                   color=color,
+                   penwidth='1.5',
+                   fontsize='14',
+                   fontname=FONT)
 
     # MCP Client Layer
     with dot.subgraph(name='cluster_client') as c:
-        c.attr(label='MCP Client Layer',
-               style='rounded,filled',
-               fillcolor='#E8F4FD',
-               color='#1976D2',
-               penwidth='2',
-               fontsize='16',
-               fontname='Helvetica-Bold')
-        c.node('client', 'MCP Client\n\n(Any AI system or\napplication)',
-               shape='box',
-               style='rounded,filled',
-               fillcolor='#5E92F3',  # Lighter blue
-               fontcolor='white',
-               fontsize='14',
-               penwidth='0')
+        filled_cluster(c, 'client', '2', '16')
+        add_nodes(c, 'client')
 
     # MCP Server Core
     with dot.subgraph(name='cluster_server') as s:
-        s.attr(label='MCP-KE Server',
-               style='rounded,filled',
-               fillcolor='#F1F8E9',
-               color='#689F38',
-               penwidth='2',
-               fontsize='16',
-               fontname='Helvetica-Bold')
-        s.node('server', 'MCP Server\n\nAuto-discovery\nTool execution\nstdio communication',
-               shape='box',
-               style='rounded,filled',
-               fillcolor='#81C784',  # Lighter green
-               fontcolor='#1B5E20',  # Dark green text
-               fontsize='14',
-               penwidth='0')
+        filled_cluster(s, 'server', '2', '16')
+        add_nodes(s, 'server')
 
         # Domain Tools
         with s.subgraph(name='cluster_domain') as d:
-            d.attr(label='Domain Tools',
-                   style='rounded,filled',
-                   fillcolor='#FFF3E0',
-                   color='#F57C00',
-                   penwidth='1.5',
-                   fontsize='14',
-                   fontname='Helvetica-Bold')
-            d.node('data_cat', 'Data Loading',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFB74D',
-                   fontcolor='#424242',
-                   fontsize='13',
-                   penwidth='0')
-            d.node('model_cat', 'Model Parameters',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFB74D',
-                   fontcolor='#424242',
-                   fontsize='13',
-                   penwidth='0')
-            d.node('analysis_cat', 'Analysis & Computation',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFB74D',
-                   fontcolor='#424242',
-                   fontsize='13',
-                   penwidth='0')
-            d.node('viz_cat', 'Visualization',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFB74D',
-                   fontcolor='#424242',
-                   fontsize='13',
-                   penwidth='0')
-            d.node('util_cat', 'Utilities',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFB74D',
-                   fontcolor='#424242',
-                   fontsize='13',
-                   penwidth='0')
+            filled_cluster(d, 'domain', '1.5', '14')
+            add_nodes(d, 'domain')
 
         # Agent Tools
         with s.subgraph(name='cluster_agent') as a:
-            a.attr(label='Agent Tools',
-                   style='rounded,filled',
-                   fillcolor='#F3E5F5',
-                   color='#7B1FA2',
-                   penwidth='1.5',
-                   fontsize='14',
-                   fontname='Helvetica-Bold')
-            a.node('agent1', 'power_spectrum_agent',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#AB47BC',  # Lighter purple
-                   fontcolor='white',
-                   fontsize='13',
-                   penwidth='0')
-            a.node('agent2', 'arxiv_agent',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#AB47BC',  # Lighter purple
-                   fontcolor='white',
-                   fontsize='13',
-                   penwidth='0')
-            a.node('agent_more', '...other agents',
-                   shape='box',
-                   style='rounded,dashed,filled',
-                   fillcolor='#E1BEE7',
-                   fontcolor='#4A148C',
-                   fontsize='13',
-                   penwidth='1.5',
-                   color='#7B1FA2')
+            filled_cluster(a, 'agent', '1.5', '14')
+            add_nodes(a, 'agent')
 
     # Core Implementation Layer
     with dot.subgraph(name='cluster_core') as core:
-        core.attr(label='Core Domain Logic',
-                  style='dashed,rounded',
-                  color='#616161',
-                  penwidth='1.5',
-                  fontsize='14',
-                  fontname='Helvetica')
-        core.node('codes', 'Domain implementations\n(cosmology, analysis, viz...)',
-                  shape='box',
-                  style='rounded,filled',
-                  fillcolor='#ECEFF1',
-                  fontcolor='#37474F',
-                  fontsize='13',
-                  penwidth='0')
+        dashed_cluster(core, 'core')
+        add_nodes(core, 'core')
 
     # External Services
     with dot.subgraph(name='cluster_external') as e:
-        e.attr(label='External Services',
-               style='dashed,rounded',
-               color='#D32F2F',
-               penwidth='1.5',
-               fontsize='14',
-               fontname='Helvetica')
-        e.node('llm_apis', 'LLM APIs',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFCDD2',
-               fontcolor='#B71C1C',
-               fontsize='13',
-               penwidth='0')
-        e.node('data_apis', 'Data APIs\n(arXiv, etc.)',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFCDD2',
-               fontcolor='#B71C1C',
-               fontsize='13',
-               penwidth='0')
-        e.node('compute', 'Compute Libraries',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFCDD2',
-               fontcolor='#B71C1C',
-               fontsize='13',
-               penwidth='0')
-
-    # Main connections
-    dot.edge('client', 'server',
-             label='MCP\nProtocol',
-             fontsize='12',
-             color='#1565C0',
-             penwidth='3',
-             arrowhead='vee')
-
-    # Server to tools
-    dot.edge('server', 'data_cat', color='#558B2F', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'model_cat', color='#558B2F', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'analysis_cat', color='#558B2F', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'viz_cat', color='#558B2F', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'util_cat', color='#558B2F', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'agent1', color='#6A1B9A', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'agent2', color='#6A1B9A', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'agent_more', style='dashed', color='#6A1B9A', penwidth='1.5', arrowhead='vee')
-
-    # Tools use core implementations
-    dot.edge('data_cat', 'codes', style='dashed', label='use', fontsize='11', color='#757575', penwidth='1', arrowhead='open')
-    dot.edge('model_cat', 'codes', style='dashed', fontsize='11', color='#757575', penwidth='1', arrowhead='open')
-    dot.edge('analysis_cat', 'codes', style='dashed', fontsize='11', color='#757575', penwidth='1', arrowhead='open')
-    dot.edge('viz_cat', 'codes', style='dashed', fontsize='11', color='#757575', penwidth='1', arrowhead='open')
-
-    # External dependencies
-    dot.edge('agent1', 'llm_apis', style='dashed', label='require', fontsize='11', color='#C62828', penwidth='1', arrowhead='open')
-    dot.edge('agent2', 'llm_apis', style='dashed', fontsize='11', color='#C62828', penwidth='1', arrowhead='open')
-    dot.edge('agent2', 'data_apis', style='dashed', fontsize='11', color='#C62828', penwidth='1', arrowhead='open')
-    dot.edge('analysis_cat', 'compute', style='dashed', label='use', fontsize='11', color='#C62828', penwidth='1', arrowhead='open')
-
-    return dot
-
-
-def mcp_overview():
-    """
-    High-level architecture showing MCP client-server relationship,
-    domain tools vs agent tools, and external dependencies.
-    """
-    dot = Digraph('MCP_KE_Overview')
-    dot.attr(rankdir='LR',
-             fontsize='20',
-             fontname='Helvetica-Bold',
-             labelloc='t',
-             label='MCP-KE Architecture: Tool Server with Domain & Agent Tools',
-             bgcolor='#FAFAFA',
-             pad='0.1',
-             nodesep='0.15',
-             ranksep='0.25',
-             dpi='300')
-    
-    # Set default node attributes
-    dot.node_attr.update(fontname='Helvetica', fontsize='13')
-    dot.edge_attr.update(fontname='Helvetica', fontsize='12')
+        dashed_cluster(e, 'external')
+        add_nodes(e, 'external')
 
-    # MCP Client Layer
-    with dot.subgraph(name='cluster_client') as c:
-        c.attr(label='MCP Client Layer',
-               style='rounded,filled',
-               fillcolor='#E3F2FD',
-               color='#1565C0',
-               penwidth='2',
-               fontsize='16',
-               fontname='Helvetica-Bold')
-        c.node('claude', 'Custom Agent\nor Claude Desktop',
-               shape='box',
-               style='rounded,filled',
-               fillcolor='#5E92F3',  # Lighter blue for better contrast
-               fontcolor='white',
-               fontsize='14',
-               penwidth='0')
+    # Each group shares one 'edge [...]' default inside an anonymous subgraph,
+    # so only the per-edge label is repeated
+    for style, group in edges:
+        with dot.subgraph() as g:
+            g.attr('edge', **style)
+            for tail, head, *label in group:
+                g.edge(tail, head, label=label[0] if label else None)
 
-    # MCP Server Core
-    with dot.subgraph(name='cluster_server') as s:
-        s.attr(label='mcp-ke MCP Server',
-               style='rounded,filled',
-               fillcolor='#E8F5E9',
-               color='#43A047',
-               penwidth='2',
-               fontsize='16',
-               fontname='Helvetica-Bold')
-        s.node('server', 'mcp_server.py\n\n• Auto-discover @tool functions\n• Build MCP Tool schemas\n• Handle tool execution\n• stdio communication',
-               shape='box',
-               style='rounded,filled',
-               fillcolor='#81C784',  # Lighter green for better contrast
-               fontcolor='#1B5E20',  # Dark green text instead of white
-               penwidth='0',
-               fontsize='13')
+    return dot.source
 
-        # Domain Tools
-        with s.subgraph(name='cluster_domain') as d:
-            d.attr(label='Domain Tools (tools/) - 16 tools',
-                   style='rounded,filled',
-                   fillcolor='#FFF8E1',
-                   color='#FFA000',
-                   penwidth='1.5',
-                   fontsize='14',
-                   fontname='Helvetica-Bold')
-            d.node('t1', 'Model Parameters\nLCDM(), nu_mass()\nwCDM()',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFCA28',
-                   fontcolor='#424242',
-                   penwidth='0',
-                   fontsize='12')
-            d.node('t2', 'Power Spectrum\ncompute_power_spectrum()\ncompute_all_models()\ncompute_suppression_ratios()',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFCA28',
-                   fontcolor='#424242',
-                   penwidth='0',
-                   fontsize='12')
-            d.node('t3', 'Data Loading\nload_observational_data()\ncreate_theory_k_grid()',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFCA28',
-                   fontcolor='#424242',
-                   penwidth='0',
-                   fontsize='12')
-            d.node('t4', 'Visualization\nplot_power_spectra()\nplot_suppression_ratios()',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFCA28',
-                   fontcolor='#424242',
-                   penwidth='0',
-                   fontsize='12')
-            d.node('t5', 'Utilities\nsave/load_array()\nsave/load_dict()\nlist_agent_files()',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#FFCA28',
-                   fontcolor='#424242',
-                   penwidth='0',
-                   fontsize='12')
 
-        # Agent Tools
-        with s.subgraph(name='cluster_agent') as a:
-            a.attr(label='Agent Tools (agent_tools/) - 2 tools',
-                   style='rounded,filled',
-                   fillcolor='#EDE7F6',
-                   color='#5E35B1',
-                   penwidth='1.5',
-                   fontsize='14',
-                   fontname='Helvetica-Bold')
-            a.node('a1', 'power_spectrum_agent\n\n4-agent orchestration:\n• orchestrator\n• data_agent\n• modeling_agent\n• viz_agent',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#AB47BC',  # Lighter purple
-                   fontcolor='white',
-                   penwidth='0',
-                   fontsize='12')
-            a.node('a2', 'arxiv_agent\n\nSingle agent with tools:\n• search_arxiv\n• download_full_arxiv_paper\n• read_text_file',
-                   shape='box',
-                   style='rounded,filled',
-                   fillcolor='#AB47BC',  # Lighter purple
-                   fontcolor='white',
-                   penwidth='0',
-                   fontsize='12')
+def _collapse_clusters(nodes, edges, collapsed):
+    """
+    Replace the nodes of each cluster in ``collapsed`` (cluster key -> new
+    node id) by a single node listing their titles, redirecting edges to it
+    and dropping the duplicates this creates.
 
-    # Core Implementation Layer
-    with dot.subgraph(name='cluster_core') as core:
-        core.attr(label='Core Implementation (codes/)',
-                  style='dashed,rounded',
-                  color='#546E7A',
-                  penwidth='1.5',
-                  fontsize='14',
-                  fontname='Helvetica')
-        core.node('codes', 'cosmology_models.py\nanalysis.py\ndata.py\nviz.py',
-                  shape='box',
-                  style='rounded,filled',
-                  fillcolor='#CFD8DC',
-                  fontcolor='#263238',
-                  penwidth='0',
-                  fontsize='12')
+    Takes and returns the ``nodes`` and ``edges`` arguments of
+    :func:`_build_overview`.
+    """
+    nodes = dict(nodes)
+    alias = {}
+    for key, new_id in collapsed.items():
+        style, entries = nodes[key]
+        titles = [label.split('\n')[0] for _, label, *_ in entries]
+        alias.update((node_id, new_id) for node_id, *_ in entries)
+        nodes[key] = (style, [(new_id, '\n'.join(titles))])
+
+    seen = set()
+    groups = []
+    for style, group in edges:
+        merged = []
+        for tail, head, *label in group:
+            tail, head = alias.get(tail, tail), alias.get(head, head)
+            if (tail, head) not in seen:
+                seen.add((tail, head))
+                merged.append((tail, head, *label))
+        groups.append((style, merged))
+    return nodes, groups
+
+
+def _graph(source):
+    """A new ``graphviz.Source`` for memoized DOT text, so callers may set its
+    format, engine or filename without affecting later calls."""
+    from graphviz import Source
+
+    return Source(source, engine='dot')
+
+
+def abstract_architecture(dpi=SCREEN_DPI):
+    """
+    High-level abstract architecture - generic and extensible view.
+    Shows MCP-KE as a tool server pattern without specific implementation details.
 
-    # External Services
-    with dot.subgraph(name='cluster_external') as e:
-        e.attr(label='External Services',
-               style='dashed,rounded',
-               color='#E53935',
-               penwidth='1.5',
-               fontsize='14',
-               fontname='Helvetica')
-        e.node('class', 'CLASS\nCosmology code',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFEBEE',
-               fontcolor='#C62828',
-               penwidth='0',
-               fontsize='12')
-        e.node('eboss', 'eBOSS DR14\nObservational data',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFEBEE',
-               fontcolor='#C62828',
-               penwidth='0',
-               fontsize='12')
-        e.node('arxiv', 'arXiv API\nPaper database',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFEBEE',
-               fontcolor='#C62828',
-               penwidth='0',
-               fontsize='12')
-        e.node('llm', 'LLM APIs\n(Anthropic, Google, etc.)',
-               shape='ellipse',
-               style='filled',
-               fillcolor='#FFEBEE',
-               fontcolor='#C62828',
-               penwidth='0',
-               fontsize='12')
-
-    # Main connections
-    dot.edge('claude', 'server',
-             label='MCP Protocol\n(stdio)',
-             fontsize='12',
-             color='#0D47A1',
-             penwidth='2.5',
-             arrowhead='vee')
-    
-    # Server to tools
-    dot.edge('server', 't1', color='#2E7D32', penwidth='2', arrowhead='vee')
-    dot.edge('server', 't2', color='#2E7D32', penwidth='2', arrowhead='vee')
-    dot.edge('server', 't3', color='#2E7D32', penwidth='2', arrowhead='vee')
-    dot.edge('server', 't4', color='#2E7D32', penwidth='2', arrowhead='vee')
-    dot.edge('server', 't5', color='#2E7D32', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'a1', color='#4527A0', penwidth='2', arrowhead='vee')
-    dot.edge('server', 'a2', color='#4527A0', penwidth='2', arrowhead='vee')
-
-    # Tools use codes/
-    dot.edge('t1', 'codes', style='dashed', label='uses', fontsize='11', color='#607D8B', penwidth='1', arrowhead='open')
-    dot.edge('t2', 'codes', style='dashed', label='uses', fontsize='11', color='#607D8B', penwidth='1', arrowhead='open')
-    dot.edge('t3', 'codes', style='dashed', label='uses', fontsize='11', color='#607D8B', penwidth='1', arrowhead='open')
-    dot.edge('t4', 'codes', style='dashed', label='uses', fontsize='11', color='#607D8B', penwidth='1', arrowhead='open')
-
-    # External dependencies
-    dot.edge('t2', 'class', style='dashed', label='calls', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-    dot.edge('t3', 'eboss', style='dashed', label='reads', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-    dot.edge('a2', 'arxiv', style='dashed', label='queries', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-    dot.edge('a1', 'class', style='dashed', label='calls', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-    dot.edge('a1', 'llm', style='dashed', label='requires', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-    dot.edge('a2', 'llm', style='dashed', label='requires', fontsize='11', color='#B71C1C', penwidth='1', arrowhead='open')
-
-    return dot
-
-
-def power_spectrum_agent_internals():
+    ``dpi`` only affects raster output; ``SCREEN_DPI`` by default.
+    The DOT text is built once per ``dpi``; each call returns a new
+    ``graphviz.Source`` for it.
+    """
+    return _graph(_abstract_architecture_source(dpi))
+
+
+@lru_cache(maxsize=None)
+def _abstract_architecture_source(dpi):
+    """DOT text of :func:`abstract_architecture`."""
+    return _build_overview(
+        'Abstract_Architecture', 'MCP-KE: Tool Server Pattern',
+        nodesep='0.2', ranksep='0.3', node_fontsize='14',
+        clusters={
+            'client': ('MCP Client Layer', '#E8F4FD', '#1976D2'),
+            'server': ('MCP-KE Server', '#F1F8E9', '#689F38'),
+            'domain': ('Domain Tools', '#FFF3E0', '#F57C00'),
+            'agent': ('Agent Tools', '#F3E5F5', AGENT_BORDER_PURPLE),
+            'core': ('Core Domain Logic', None, '#616161'),
+            'external': ('External Services', None, '#D32F2F'),
+        },
+        nodes={
+            'client': (ABSTRACT_CLIENT_NODE, [
+                ('client', 'MCP Client\n\n(Any AI system or\napplication)'),
+            ]),
+            'server': (ABSTRACT_SERVER_NODE, [
+                ('server', 'MCP Server\n\nAuto-discovery\nTool execution\nstdio communication'),
+            ]),
+            'domain': (ABSTRACT_DOMAIN_NODE, [
+                ('data_cat', 'Data Loading'),
+                ('model_cat', 'Model Parameters'),
+                ('analysis_cat', 'Analysis & Computation'),
+                ('viz_cat', 'Visualization'),
+                ('util_cat', 'Utilities'),
+            ]),
+            'agent': (ABSTRACT_AGENT_NODE, [
+                ('agent1', 'power_spectrum_agent'),
+                ('agent2', 'arxiv_agent'),
+                ('agent_more', '...other agents', ABSTRACT_MORE_AGENTS_NODE),
+            ]),
+            'core': (ABSTRACT_CORE_NODE, [
+                ('codes', 'Domain implementations\n(cosmology, analysis, viz...)'),
+            ]),
+            'external': (ABSTRACT_EXTERNAL_NODE, [
+                ('llm_apis', 'LLM APIs'),
+                ('data_apis', 'Data APIs\n(arXiv, etc.)'),
+                ('compute', 'Compute Libraries'),
+            ]),
+        },
+        edges=[
+            # Main connections
+            (ABSTRACT_PROTOCOL_EDGE, [('client', 'server', 'MCP\nProtocol')]),
+
+            # Server to tools
+            (ABSTRACT_TOOL_EDGE, [('server', node_id) for node_id in ABSTRACT_TOOL_IDS]),
+            (ABSTRACT_AGENT_EDGE, [('server', node_id) for node_id in ABSTRACT_AGENT_IDS]),
+            (ABSTRACT_MORE_AGENTS_EDGE, [('server', 'agent_more')]),
+
+            # Tools use core implementations
+            (ABSTRACT_USES_EDGE, [
+                ('data_cat', 'codes', 'use'),
+                ('model_cat', 'codes'),
+                ('analysis_cat', 'codes'),
+                ('viz_cat', 'codes'),
+            ]),
+
+            # External dependencies
+            (ABSTRACT_EXTERNAL_EDGE, [
+                ('agent1', 'llm_apis', 'require'),
+                ('agent2', 'llm_apis'),
+                ('agent2', 'data_apis'),
+                ('analysis_cat', 'compute', 'use'),
+            ]),
+        ],
+        dpi=dpi)
+
+
+def mcp_overview(dpi=SCREEN_DPI, detail='full'):
+    """
+    High-level architecture showing MCP client-server relationship,
+    domain tools vs agent tools, and external dependencies.
+
+    ``dpi`` only affects raster output; ``SCREEN_DPI`` by default.
+    The DOT text is built once per ``dpi`` and ``detail``; each call returns
+    a new ``graphviz.Source`` for it.
+
+    ``detail='summary'`` collapses the domain and agent tool clusters to one
+    node each that lists the tool groups, for READMEs and for keeping the
+    layout small as tools are added.
+    """
+    if detail not in ('full', 'summary'):
+        raise ValueError(f"detail must be 'full' or 'summary', got {detail!r}")
+    return _graph(_mcp_overview_source(dpi, detail))
+
+
+@lru_cache(maxsize=None)
+def _mcp_overview_source(dpi, detail):
+    """DOT text of :func:`mcp_overview`."""
+    nodes = {
+        'client': (OVERVIEW_CLIENT_NODE, [
+            ('claude', 'Custom Agent\nor Claude Desktop'),
+        ]),
+        'server': (OVERVIEW_SERVER_NODE, [
+            ('server', 'mcp_server.py\n\n• Auto-discover @tool functions\n• Build MCP Tool schemas\n• Handle tool execution\n• stdio communication'),
+        ]),
+        'domain': (OVERVIEW_DOMAIN_NODE, [
+            ('t1', 'Model Parameters\nLCDM(), nu_mass()\nwCDM()'),
+            ('t2', 'Power Spectrum\ncompute_power_spectrum()\ncompute_all_models()\ncompute_suppression_ratios()'),
+            ('t3', 'Data Loading\nload_observational_data()\ncreate_theory_k_grid()'),
+            ('t4', 'Visualization\nplot_power_spectra()\nplot_suppression_ratios()'),
+            ('t5', 'Utilities\nsave/load_array()\nsave/load_dict()\nlist_agent_files()'),
+        ]),
+        'agent': (OVERVIEW_AGENT_NODE, [
+            ('a1', 'power_spectrum_agent\n\n4-agent orchestration:\n• orchestrator\n• data_agent\n• modeling_agent\n• viz_agent'),
+            ('a2', 'arxiv_agent\n\nSingle agent with tools:\n• search_arxiv\n• download_full_arxiv_paper\n• read_text_file'),
+        ]),
+        'core': (OVERVIEW_CORE_NODE, [
+            ('codes', 'cosmology_models.py\nanalysis.py\ndata.py\nviz.py'),
+        ]),
+        'external': (OVERVIEW_EXTERNAL_NODE, [
+            ('class', 'CLASS\nCosmology code'),
+            ('eboss', 'eBOSS DR14\nObservational data'),
+            ('arxiv', 'arXiv API\nPaper database'),
+            ('llm', 'LLM APIs\n(Anthropic, Google, etc.)'),
+        ]),
+    }
+
+    edges = [
+        # Main connections
+        (OVERVIEW_PROTOCOL_EDGE, [('claude', 'server', 'MCP Protocol\n(stdio)')]),
+
+        # Server to tools
+        (OVERVIEW_TOOL_EDGE, [('server', node_id) for node_id in OVERVIEW_TOOL_IDS]),
+        (OVERVIEW_AGENT_EDGE, [('server', node_id) for node_id in OVERVIEW_AGENT_IDS]),
+
+        # Tools use codes/
+        (dict(OVERVIEW_USES_EDGE, label='uses'),
+         [(node_id, 'codes') for node_id in OVERVIEW_CODES_USERS]),
+
+        # External dependencies
+        (OVERVIEW_EXTERNAL_EDGE, [
+            ('t2', 'class', 'calls'),
+            ('t3', 'eboss', 'reads'),
+            ('a2', 'arxiv', 'queries'),
+            ('a1', 'class', 'calls'),
+            ('a1', 'llm', 'requires'),
+            ('a2', 'llm', 'requires'),
+        ]),
+    ]
+
+    if detail == 'summary':
+        nodes, edges = _collapse_clusters(nodes, edges, {'domain': 'tools', 'agent': 'agents'})
+
+    return _build_overview(
+        'MCP_KE_Overview', 'MCP-KE Architecture: Tool Server with Domain & Agent Tools',
+        nodesep='0.15', ranksep='0.25', node_fontsize='13',
+        clusters={
+            'client': ('MCP Client Layer', '#E3F2FD', PROTOCOL_BLUE),
+            'server': ('mcp-ke MCP Server', '#E8F5E9', '#43A047'),
+            'domain': ('Domain Tools (tools/) - 16 tools', '#FFF8E1', '#FFA000'),
+            'agent': ('Agent Tools (agent_tools/) - 2 tools', '#EDE7F6', '#5E35B1'),
+            'core': ('Core Implementation (codes/)', None, '#546E7A'),
+            'external': ('External Services', None, '#E53935'),
+        },
+        nodes=nodes,
+        edges=edges,
+        dpi=dpi)
+
+
+def power_spectrum_agent_internals(dpi=SCREEN_DPI):
     """
     Simplified generic view of multi-agent orchestration showing dataflow.
+
+    ``dpi`` only affects raster output; ``SCREEN_DPI`` by default.
+    The DOT text is built once per ``dpi``; each call returns a new
+    ``graphviz.Source`` for it.
     """
-    dot = Digraph('Power_Spectrum_Agent')
+    return _graph(_power_spectrum_agent_source(dpi))
+
+
+@lru_cache(maxsize=None)
+def _power_spectrum_agent_source(dpi):
+    """DOT text of :func:`power_spectrum_agent_internals`."""
+    from graphviz import Digraph
+
+    dot = Digraph('Power_Spectrum_Agent', engine='dot')
     dot.attr(rankdir='TB',
-             fontsize='20',
-             fontname='Helvetica-Bold',
-             labelloc='t',
              label='Multi-Agent Orchestration: Generic Dataflow Pattern',
-             bgcolor='#FAFAFA',
-             pad='0.1',
              nodesep='0.2',
              ranksep='0.3',
-             dpi='300')
+             dpi=dpi,
+             **GRAPH_DEFAULTS)
     
-    # Set default node attributes
-    dot.node_attr.update(fontname='Helvetica', fontsize='14')
-    dot.edge_attr.update(fontname='Helvetica', fontsize='12')
-
-    # MCP Client
-    dot.node('client', 'MCP Client',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#5E92F3',  # Lighter blue
-             fontcolor='white',
-             penwidth='0',
-             fontsize='16')
-
-    # Agent tool entry point
-    dot.node('agent_tool', 'Agent Tool\n(e.g., power_spectrum_agent)',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#AB47BC',  # Lighter purple
-             fontcolor='white',
-             penwidth='0',
-             fontsize='14')
-
-    # Orchestrator
-    dot.node('orchestrator', 'Orchestrator Agent\n\nCoordinates sub-agents\nManages dataflow',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#FF8A65',  # Lighter orange
-             fontcolor='white',
-             penwidth='0',
-             fontsize='14')
+    # Set default node and edge attributes; nodes only add their fill colour
+    # and any departures from these
+    dot.node_attr.update(fontname=FONT, fontsize='14', fontcolor='white', **BOX_NODE)
+    dot.edge_attr.update(EDGE_DEFAULTS)
 
-    # Sub-agents in a row
-    dot.node('agent1', 'Sub-Agent 1\n\nData Loading',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#4DB6AC',  # Lighter teal
-             fontcolor='white',
-             penwidth='0',
-             fontsize='13')
-    dot.node('agent2', 'Sub-Agent 2\n\nProcessing',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#64B5F6',  # Lighter blue
-             fontcolor='white',
-             penwidth='0',
-             fontsize='13')
-    dot.node('agent3', 'Sub-Agent 3\n\nVisualization',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#F06292',  # Lighter pink
-             fontcolor='white',
-             penwidth='0',
-             fontsize='13')
-
-    # Results
-    dot.node('results', 'Results',
-             shape='box',
-             style='rounded,filled',
-             fillcolor='#FDD835',
-             fontcolor='#424242',
-             penwidth='0',
-             fontsize='16')
-
-    # Main flow
-    dot.edge('client', 'agent_tool',
-             label='1. Query',
-             fontsize='12',
-             penwidth='2.5',
-             color='#0D47A1',
-             arrowhead='vee',
-             fontcolor='#0D47A1')
-    dot.edge('agent_tool', 'orchestrator',
-             label='2. Initialize',
-             fontsize='12',
-             color='#6A1B9A',
-             penwidth='2',
-             arrowhead='vee',
-             fontcolor='#6A1B9A')
-
-    # Orchestrator to sub-agents
-    dot.edge('orchestrator', 'agent1',
-             label='3. Task 1',
-             fontsize='11',
-             color='#00695C',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#00695C')
-    dot.edge('agent1', 'orchestrator',
-             label='Data',
-             fontsize='11',
-             color='#00695C',
-             style='dashed',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#00695C')
-
-    dot.edge('orchestrator', 'agent2',
-             label='4. Task 2',
-             fontsize='11',
-             color='#0277BD',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#0277BD')
-    dot.edge('agent2', 'orchestrator',
-             label='Results',
-             fontsize='11',
-             color='#0277BD',
-             style='dashed',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#0277BD')
-
-    dot.edge('orchestrator', 'agent3',
-             label='5. Task 3',
-             fontsize='11',
-             color='#AD1457',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#AD1457')
-    dot.edge('agent3', 'orchestrator',
-             label='Outputs',
-             fontsize='11',
-             color='#AD1457',
-             style='dashed',
-             penwidth='1.5',
-             arrowhead='vee',
-             fontcolor='#AD1457')
-
-    # Final results
-    dot.edge('orchestrator', 'results',
-             label='6. Assemble',
-             fontsize='12',
-             color='#E65100',
-             penwidth='2',
-             arrowhead='vee',
-             fontcolor='#E65100')
-    dot.edge('results', 'client',
-             label='7. Return',
-             fontsize='12',
-             penwidth='2.5',
-             color='#0D47A1',
-             arrowhead='vee',
-             fontcolor='#0D47A1')
-
-    return dot
+    for node_id, label, fillcolor, overrides in FLOW_NODES:
+        dot.node(node_id, label, fillcolor=fillcolor, **overrides)
 
+    for tail, head, label, color, style in FLOW_EDGES:
+        dot.edge(tail, head, label=label, color=color, fontcolor=color, **style)
+
+    return dot.source
+
+
+# Rendered outputs, stored under the hash of everything that determines them
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.diagram-cache')
+# Output path -> [mtime of this file, dpi, format, Graphviz version] when that
+# output was last written
+MTIME_INDEX = os.path.join(CACHE_DIR, 'mtime.json')
+
+
+@lru_cache(maxsize=None)
+def _graphviz_version(engine='dot'):
+    """Version banner of the installed Graphviz, e.g. 'dot - graphviz version 2.43.0 (0)'."""
+    result = subprocess.run([engine, '-V'], capture_output=True, check=True)
+    # dot prints its version on stderr
+    return result.stderr.strip()
 
-if __name__ == '__main__':
-    print("Generating professional flowcharts with improved text size and spacing...")
 
-    d0 = abstract_architecture()
-    d0.render('abstract_architecture', format='png', cleanup=True)
-    print("✓ Generated abstract_architecture.png")
+def _cache_key(source, version, fmt):
+    """BLAKE2b over the DOT source, the Graphviz version and the output format."""
+    data = source + b'\0' + version + b'\0' + fmt.encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
-    d1 = mcp_overview()
-    d1.render('mcp_ke_overview', format='png', cleanup=True)
-    print("✓ Generated mcp_ke_overview.png")
 
-    d2 = power_spectrum_agent_internals()
-    d2.render('power_spectrum_agent', format='png', cleanup=True)
-    print("✓ Generated power_spectrum_agent.png")
+def _extension(fmt):
+    """File extension for a dot output format; 'png:gd' is written as .png."""
+    return fmt.partition(':')[0]
+
+
+def _formats(fmt):
+    """
+    Normalise ``fmt`` to a tuple of formats, rejecting formats that would
+    write the same file, such as 'png' and 'png:gd'.
+    """
+    fmts = (fmt,) if isinstance(fmt, str) else tuple(fmt)
+    extensions = [_extension(f) for f in fmts]
+    clashes = sorted({ext for ext in extensions if extensions.count(ext) > 1})
+    if clashes:
+        raise ValueError(f"Formats {list(fmts)} write the same file extension: {clashes}")
+    return fmts
+
+
+def _is_current(name, fmt, digest):
+    """True if the ``fmt`` output of ``name`` was rendered with this cache key."""
+    path = f'{name}.{_extension(fmt)}'
+    hash_path = path + '.hash'
+    if not (os.path.exists(path) and os.path.exists(hash_path)):
+        return False
+    with open(hash_path) as f:
+        return f.read().strip() == digest
+
+
+def render_changed(diagrams, fmt='png', jobs=2, outdir='.'):
+    """
+    Render every diagram whose output is out of date.
+
+    Outputs are content-addressed: each is stored in ``CACHE_DIR`` under the
+    BLAKE2b hash of its DOT source, the Graphviz version and the format, and
+    that key is also kept in a ``name``.``fmt``.hash sidecar next to the output.
+    Outputs whose sidecar matches are left alone; outputs already in the
+    cache are copied out; only the rest are laid out by ``dot``. The source
+    is piped on stdin, up to ``jobs`` processes run at once, and one process
+    writes all missing formats of a diagram from a single layout. PNGs are
+    recompressed with ``optipng`` if it is installed.
+
+    Args:
+        diagrams: Iterable of (graphviz Source or Digraph, output name) pairs
+        fmt: Output format, or a sequence of formats such as ('png', 'svg');
+            'svg' skips rasterization entirely. A renderer may be named as
+            in dot's -T option, e.g. 'png:gd', and is part of the cache key;
+            the file still gets the plain extension, so at most one format
+            per extension may be given
+        jobs: Maximum number of concurrent ``dot`` processes
+        outdir: Directory the outputs and their sidecars are written to
+
+    Returns:
+        Names of the diagrams whose outputs were written.
+
+    Raises:
+        ValueError: If two formats share a file extension.
+    """
+    fmts = _formats(fmt)
+    updated = []
+    misses = []
+    for dot, name in diagrams:
+        # Digraph.source re-joins the whole body on every access, so
+        # encode once and reuse the bytes for hashing and for dot's stdin
+        source = dot.source.encode()
+        version = _graphviz_version(dot.engine)
+        outputs = [(f, _cache_key(source, version, f)) for f in fmts]
+        base = os.path.join(outdir, name)
+        outputs = [(f, key) for f, key in outputs if not _is_current(base, f, key)]
+        if not outputs:
+            continue
+        updated.append((name, base, outputs))
+        missing = [(f, key) for f, key in outputs
+                   if not os.path.exists(os.path.join(CACHE_DIR, f'{key}.{_extension(f)}'))]
+        if missing:
+            misses.append((dot.engine, source, missing))
+
+    if misses:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # The layout work happens in the dot subprocesses, so threads suffice
+        with ThreadPoolExecutor(max_workers=min(jobs, len(misses))) as pool:
+            list(pool.map(lambda item: _pipe_to_dot(*item), misses))
+
+    if updated:
+        os.makedirs(outdir, exist_ok=True)
+    for _, base, outputs in updated:
+        for f, key in outputs:
+            ext = _extension(f)
+            shutil.copyfile(os.path.join(CACHE_DIR, f'{key}.{ext}'), f'{base}.{ext}')
+            with open(f'{base}.{ext}.hash', 'w') as out:
+                out.write(key)
+    return [name for name, _, _ in updated]
+
+
+def _pipe_to_dot(engine, source, outputs):
+    """Lay out ``source`` once with ``engine`` and write each (format, key) to the cache."""
+    cmd = [engine]
+    for fmt, key in outputs:
+        cmd += ['-T' + fmt, '-o', os.path.join(CACHE_DIR, f'{key}.{_extension(fmt)}.tmp')]
+    subprocess.run(cmd, input=source, check=True)
+    for fmt, key in outputs:
+        path = os.path.join(CACHE_DIR, f'{key}.{_extension(fmt)}')
+        # dot's PNG encoders compress lightly; recompress losslessly when available
+        if _extension(fmt) == 'png' and shutil.which('optipng'):
+            subprocess.run(['optipng', '-o1', '-quiet', path + '.tmp'], check=True)
+        # Publish only complete files so a failed run cannot poison the cache
+        os.replace(path + '.tmp', path)
+
+
+def render_builders(builders, fmt='png', dpi=PRINT_DPI, jobs=2, outdir='.'):
+    """
+    Build and render diagrams, skipping those this file cannot have changed.
+
+    If flowchart.py has not been modified since an output was last written
+    at the same ``dpi`` and format by the same Graphviz version, and that
+    output still exists, its builder is not even called. Everything else goes
+    through :func:`render_changed`, whose content hash still decides whether
+    ``dot`` has to run.
+
+    Args:
+        builders: Iterable of (builder function, output name) pairs
+        fmt, jobs, outdir: As for :func:`render_changed`
+        dpi: Raster resolution passed to each builder
+
+    Returns:
+        Names of the diagrams whose outputs were written.
+    """
+    fmts = _formats(fmt)
+    stamp = os.stat(__file__).st_mtime_ns
+    # Every builder lays out with dot; an upgrade must invalidate its outputs
+    version = _graphviz_version('dot').decode(errors='replace')
+    try:
+        with open(MTIME_INDEX) as f:
+            stamps = json.load(f)
+    except (OSError, ValueError):
+        stamps = {}
+
+    todo = []
+    for build, name in builders:
+        paths = [(os.path.abspath(os.path.join(outdir, f'{name}.{_extension(f)}')), f)
+                 for f in fmts]
+        if all(stamps.get(path) == [stamp, dpi, f, version] and os.path.exists(path)
+               for path, f in paths):
+            continue
+        todo.append((build(dpi=dpi), name, paths))
+    if not todo:
+        return []
+
+    rendered = render_changed([(dot, name) for dot, name, _ in todo], fmts, jobs, outdir)
+    for _, _, paths in todo:
+        stamps.update((path, [stamp, dpi, f, version]) for path, f in paths)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(MTIME_INDEX, 'w') as f:
+        json.dump(stamps, f, indent=1, sort_keys=True)
+    return rendered
+
+
+if __name__ == '__main__':
+    import argparse
+
+    # Short names for --only, mapped to (builder, output name)
+    DIAGRAMS = {
+        'abstract': (abstract_architecture, 'abstract_architecture'),
+        'overview': (mcp_overview, 'mcp_ke_overview'),
+        'agent': (power_spectrum_agent_internals, 'power_spectrum_agent'),
+    }
+
+    parser = argparse.ArgumentParser(description='Render the documentation flowcharts.')
+    parser.add_argument('--only', choices=list(DIAGRAMS), action='append',
+                        help='Render only this diagram (repeatable); default renders all')
+    parser.add_argument('--outdir', default='.',
+                        help='Directory to write the images to (default: current directory)')
+    parser.add_argument('--format', action='append', dest='formats',
+                        help='Output format, e.g. svg or png:gd to pick the renderer '
+                             '(repeatable; default: png)')
+    parser.add_argument('--dpi', default=PRINT_DPI,
+                        help=f'Raster resolution (default: {PRINT_DPI}; {SCREEN_DPI} for screen)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Build the diagrams and report their DOT size without running dot '
+                             '(also implied by FLOWCHART_SKIP_RENDER=1)')
+    args = parser.parse_args()
+    formats = args.formats or ['png']
+    try:
+        _formats(formats)
+    except ValueError as e:
+        parser.error(str(e))
+    builders = [DIAGRAMS[key] for key in args.only or DIAGRAMS]
+
+    # Lets tooling that happens to execute this script avoid spawning dot
+    if args.dry_run or os.environ.get('FLOWCHART_SKIP_RENDER', '') not in ('', '0'):
+        print('\n'.join(f"{name}: {len(build(dpi=args.dpi).source)} characters of DOT"
+                        for build, name in builders))
+        raise SystemExit(0)
+
+    print("Generating professional flowcharts with improved text size and spacing...")
 
-    print("\nAll flowcharts generated successfully!")
\ No newline at end of file
+    rendered = render_builders(builders, fmt=formats, dpi=args.dpi, outdir=args.outdir)
+    files = '/'.join(_extension(f) for f in formats)
+    # One write for the whole report rather than a flush per diagram
+    report = [f"✓ Generated {name}.{files}" if name in rendered else
+              f"• {name}.{files} is up to date"
+              for _, name in builders]
+    report.append("\nAll flowcharts generated successfully!")
+    print('\n'.join(report))
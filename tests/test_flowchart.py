@@ -0,0 +1,257 @@
+"""Test the documentation flowchart builders, render cache and CLI without Graphviz."""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# documentation/ is not a package; import flowchart.py from it directly
+DOCS_DIR = Path(__file__).parent.parent / 'documentation'
+sys.path.insert(0, str(DOCS_DIR))
+
+import flowchart
+
+
+class FakeDiagram:
+    """Stands in for a graphviz.Source: render_changed only reads these two attributes."""
+
+    def __init__(self, source, engine='dot'):
+        self.source = source
+        self.engine = engine
+
+
+@pytest.fixture
+def fake_dot(tmp_path, monkeypatch):
+    """Redirect the cache to tmp_path and record dot runs instead of spawning dot."""
+    calls = []
+
+    def pipe_to_dot(engine, source, outputs):
+        calls.append((engine, source, [fmt for fmt, _ in outputs]))
+        for fmt, key in outputs:
+            path = os.path.join(flowchart.CACHE_DIR, f'{key}.{flowchart._extension(fmt)}')
+            with open(path, 'w') as f:
+                f.write(f'{fmt} {key}')
+
+    cache_dir = str(tmp_path / 'cache')
+    monkeypatch.setattr(flowchart, 'CACHE_DIR', cache_dir)
+    monkeypatch.setattr(flowchart, 'MTIME_INDEX', os.path.join(cache_dir, 'mtime.json'))
+    monkeypatch.setattr(flowchart, '_pipe_to_dot', pipe_to_dot)
+    monkeypatch.setattr(flowchart, '_graphviz_version',
+                        lambda engine='dot': b'dot - graphviz version 2.43.0 (0)')
+    return calls
+
+
+class TestCollapseClusters:
+    """Test _collapse_clusters merges cluster nodes and deduplicates edges."""
+
+    def test_collapses_nodes_and_redirects_edges(self):
+        style = {'fillcolor': 'white'}
+        nodes = {
+            'domain': (style, [('t1', 'Data\nload()'), ('t2', 'Models\nrun()')]),
+            'core': (style, [('codes', 'codes/')]),
+        }
+        edges = [
+            ({'color': 'green'}, [('server', 't1'), ('server', 't2')]),
+            ({'color': 'gray'}, [('t1', 'codes', 'uses'), ('t2', 'codes')]),
+        ]
+
+        nodes, edges = flowchart._collapse_clusters(nodes, edges, {'domain': 'tools'})
+
+        assert nodes['domain'] == (style, [('tools', 'Data\nModels')])
+        assert nodes['core'] == (style, [('codes', 'codes/')])
+        assert edges == [
+            ({'color': 'green'}, [('server', 'tools')]),
+            ({'color': 'gray'}, [('tools', 'codes', 'uses')]),
+        ]
+
+
+class TestBuilders:
+    """Test the public builders and their memoized DOT text."""
+
+    def setup_method(self):
+        pytest.importorskip('graphviz')
+
+    def test_summary_source_collapses_tool_clusters(self):
+        source = flowchart.mcp_overview(detail='summary').source
+
+        for node_id in flowchart.OVERVIEW_TOOL_IDS + flowchart.OVERVIEW_AGENT_IDS:
+            assert not re.search(rf'^\s*{node_id}\b', source, re.M)
+        assert re.search(r'^\s*tools \[label=', source, re.M)
+        assert re.search(r'^\s*agents \[label=', source, re.M)
+        # Five server -> tool edges and four tool -> codes edges collapse to one each
+        assert len(re.findall(r'^\s*server -> tools\b', source, re.M)) == 1
+        assert len(re.findall(r'^\s*tools -> codes\b', source, re.M)) == 1
+        assert len(re.findall(r'^\s*server -> agents\b', source, re.M)) == 1
+
+    def test_full_source_keeps_tool_nodes(self):
+        source = flowchart.mcp_overview().source
+        for node_id in flowchart.OVERVIEW_TOOL_IDS:
+            assert re.search(rf'^\s*{node_id} \[label=', source, re.M)
+
+    def test_bad_detail_raises(self):
+        with pytest.raises(ValueError, match='detail'):
+            flowchart.mcp_overview(detail='brief')
+
+    def test_each_call_returns_a_new_source(self):
+        graph = flowchart.mcp_overview()
+        graph.format = 'svg'
+        graph.engine = 'neato'
+
+        again = flowchart.mcp_overview()
+        assert again is not graph
+        assert again.engine == 'dot'
+        assert again.format != 'svg'
+        assert again.source == graph.source
+
+
+class TestRenderChanged:
+    """Test the content-addressed render cache."""
+
+    def test_cache_hit_skips_dot(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        diagram = FakeDiagram('digraph { a -> b }')
+
+        assert flowchart.render_changed([(diagram, 'graph')], 'png', outdir=outdir) == ['graph']
+        assert len(fake_dot) == 1
+        assert os.path.exists(os.path.join(outdir, 'graph.png'))
+        assert os.path.exists(os.path.join(outdir, 'graph.png.hash'))
+
+        # Output and sidecar current: nothing to do
+        assert flowchart.render_changed([(diagram, 'graph')], 'png', outdir=outdir) == []
+        assert len(fake_dot) == 1
+
+        # Output lost but still cached: copied back without running dot
+        os.remove(os.path.join(outdir, 'graph.png'))
+        assert flowchart.render_changed([(diagram, 'graph')], 'png', outdir=outdir) == ['graph']
+        assert len(fake_dot) == 1
+
+    def test_changed_source_runs_dot(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        flowchart.render_changed([(FakeDiagram('digraph { a }'), 'graph')], 'png', outdir=outdir)
+        flowchart.render_changed([(FakeDiagram('digraph { b }'), 'graph')], 'png', outdir=outdir)
+        assert len(fake_dot) == 2
+
+    def test_formats_share_one_dot_run(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        flowchart.render_changed([(FakeDiagram('digraph { a }'), 'graph')], ['png', 'svg'],
+                                 outdir=outdir)
+        assert [fmts for _, _, fmts in fake_dot] == [['png', 'svg']]
+        assert sorted(os.listdir(outdir)) == ['graph.png', 'graph.png.hash',
+                                              'graph.svg', 'graph.svg.hash']
+
+    def test_formats_sharing_an_extension_rejected(self, fake_dot, tmp_path):
+        with pytest.raises(ValueError, match='png'):
+            flowchart.render_changed([(FakeDiagram('digraph { a }'), 'graph')],
+                                     ['png', 'png:gd'], outdir=str(tmp_path / 'out'))
+        assert fake_dot == []
+
+    def test_renderer_suffix_keeps_plain_extension(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        flowchart.render_changed([(FakeDiagram('digraph { a }'), 'graph')], 'png:gd',
+                                 outdir=outdir)
+        assert [fmts for _, _, fmts in fake_dot] == [['png:gd']]
+        assert sorted(os.listdir(outdir)) == ['graph.png', 'graph.png.hash']
+
+
+class TestRenderBuilders:
+    """Test the mtime fast path in front of the render cache."""
+
+    def setup_method(self):
+        self.builds = []
+
+    def build(self, dpi):
+        self.builds.append(dpi)
+        return FakeDiagram(f'digraph {{ dpi={dpi} }}')
+
+    def test_unchanged_output_skips_builder(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        builders = [(self.build, 'graph')]
+
+        assert flowchart.render_builders(builders, dpi='96', outdir=outdir) == ['graph']
+        assert flowchart.render_builders(builders, dpi='96', outdir=outdir) == []
+        assert self.builds == ['96']
+        assert len(fake_dot) == 1
+
+        with open(flowchart.MTIME_INDEX) as f:
+            stamps = json.load(f)
+        path = os.path.abspath(os.path.join(outdir, 'graph.png'))
+        assert stamps[path][1:] == ['96', 'png', 'dot - graphviz version 2.43.0 (0)']
+
+    def test_other_dpi_rebuilds(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        builders = [(self.build, 'graph')]
+        flowchart.render_builders(builders, dpi='96', outdir=outdir)
+        assert flowchart.render_builders(builders, dpi='300', outdir=outdir) == ['graph']
+        assert self.builds == ['96', '300']
+
+    def test_missing_output_rebuilds(self, fake_dot, tmp_path):
+        outdir = str(tmp_path / 'out')
+        builders = [(self.build, 'graph')]
+        flowchart.render_builders(builders, dpi='96', outdir=outdir)
+        os.remove(os.path.join(outdir, 'graph.png'))
+        assert flowchart.render_builders(builders, dpi='96', outdir=outdir) == ['graph']
+        assert self.builds == ['96', '96']
+
+    def test_formats_sharing_an_extension_rejected(self, fake_dot, tmp_path):
+        with pytest.raises(ValueError, match='png'):
+            flowchart.render_builders([(self.build, 'graph')], ['png:gd', 'png'],
+                                      outdir=str(tmp_path / 'out'))
+        assert self.builds == []
+
+    def test_graphviz_upgrade_rebuilds(self, fake_dot, tmp_path, monkeypatch):
+        outdir = str(tmp_path / 'out')
+        builders = [(self.build, 'graph')]
+        flowchart.render_builders(builders, dpi='96', outdir=outdir)
+
+        monkeypatch.setattr(flowchart, '_graphviz_version',
+                            lambda engine='dot': b'dot - graphviz version 9.0.0 (0)')
+        assert flowchart.render_builders(builders, dpi='96', outdir=outdir) == ['graph']
+        assert self.builds == ['96', '96']
+        assert len(fake_dot) == 2
+
+
+class TestCLI:
+    """Test the command line entry point's dry run, which never spawns dot."""
+
+    def run(self, *args, env=None):
+        pytest.importorskip('graphviz')
+        return subprocess.run([sys.executable, str(DOCS_DIR / 'flowchart.py'), *args],
+                              capture_output=True, text=True, env=env)
+
+    def test_dry_run_reports_selected_diagrams(self):
+        result = self.run('--dry-run', '--only', 'agent', '--only', 'abstract')
+        assert result.returncode == 0
+        assert re.fullmatch(r'power_spectrum_agent: \d+ characters of DOT\n'
+                            r'abstract_architecture: \d+ characters of DOT\n', result.stdout)
+
+    @pytest.mark.parametrize('value', ['1', 'yes'])
+    def test_skip_render_env_implies_dry_run(self, value):
+        result = self.run('--only', 'agent', env={**os.environ, 'FLOWCHART_SKIP_RENDER': value})
+        assert result.returncode == 0
+        assert re.fullmatch(r'power_spectrum_agent: \d+ characters of DOT\n', result.stdout)
+
+    @pytest.mark.parametrize('value', ['', '0'])
+    def test_empty_or_zero_skip_render_env_renders(self, value, tmp_path):
+        # No dot on PATH, so reaching the render step fails instead of printing sizes
+        env = {**os.environ, 'FLOWCHART_SKIP_RENDER': value, 'PATH': str(tmp_path)}
+        result = self.run('--only', 'agent', '--outdir', str(tmp_path), env=env)
+        assert 'characters of DOT' not in result.stdout
+        assert result.returncode != 0
+
+    def test_formats_sharing_an_extension_rejected(self):
+        result = self.run('--only', 'agent', '--format', 'png', '--format', 'png:gd')
+        assert result.returncode == 2
+        assert 'same file extension' in result.stderr
+
+    def test_unknown_diagram_rejected(self):
+        result = self.run('--dry-run', '--only', 'nope')
+        assert result.returncode == 2
+        assert 'invalid choice' in result.stderr
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
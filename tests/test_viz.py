@@ -0,0 +1,274 @@
+"""Test codes.viz figure reuse and plotting helpers."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codes.viz import (
+    _log_decimation_index,
+    _safe_ratio,
+    plot_model_comparison_grid,
+    plot_power_spectra,
+    plot_power_spectra_update,
+    plot_scale_dependent_effects,
+    plot_suppression_ratios,
+    plot_suppression_ratios_update,
+)
+
+
+def lines_by_gid(fig, gid):
+    """All lines of a figure tagged with the given model name, in axes order."""
+    return [line for ax in fig.axes for line in ax.get_lines() if line.get_gid() == gid]
+
+
+class TestPlotPowerSpectraUpdate:
+    """Test plot_power_spectra_update reuses the existing figure."""
+
+    def setup_method(self):
+        self.k = np.logspace(-4, 1, 50)
+        self.pk_lcdm = 1e4 * (self.k / 0.01) ** (-2.5)
+        self.model_results = {
+            'ΛCDM': self.pk_lcdm,
+            'wCDM (w0=-0.9)': 0.95 * self.pk_lcdm,
+        }
+        self.fig = plot_power_spectra(self.k, self.model_results, None, None, None,
+                                      save_path=None)
+
+    def teardown_method(self):
+        plt.close(self.fig)
+
+    def test_updates_model_lines_in_place(self):
+        n_lines = [len(ax.get_lines()) for ax in self.fig.axes]
+
+        out_path = os.path.join(tempfile.mkdtemp(), 'update.png')
+        result = plot_power_spectra_update(self.fig, {'wCDM (w0=-0.9)': 0.8 * self.pk_lcdm},
+                                           save_path=out_path)
+
+        assert result is self.fig
+        assert [len(ax.get_lines()) for ax in self.fig.axes] == n_lines
+        top, ratio = lines_by_gid(self.fig, 'wCDM (w0=-0.9)')
+        np.testing.assert_allclose(top.get_ydata(), 0.8 * self.pk_lcdm)
+        np.testing.assert_allclose(ratio.get_ydata(), 0.8)
+        assert os.path.exists(out_path)
+
+    def test_lcdm_only_update_recomputes_all_ratios(self):
+        """A new ΛCDM curve must refresh the ratios of models not in the update."""
+        plot_power_spectra_update(self.fig, {'wCDM (w0=-0.9)': 0.8 * self.pk_lcdm})
+        plot_power_spectra_update(self.fig, {'ΛCDM': 2 * self.pk_lcdm})
+
+        top, ratio = lines_by_gid(self.fig, 'wCDM (w0=-0.9)')
+        np.testing.assert_allclose(top.get_ydata(), 0.8 * self.pk_lcdm)
+        np.testing.assert_allclose(ratio.get_ydata(), 0.4)
+
+    def test_unknown_model_raises(self):
+        top = lines_by_gid(self.fig, 'wCDM (w0=-0.9)')[0]
+        with pytest.raises(ValueError, match='Thermal WDM'):
+            plot_power_spectra_update(self.fig, {
+                'wCDM (w0=-0.9)': 0.8 * self.pk_lcdm,
+                'Thermal WDM (all DM, m=3 keV)': 0.5 * self.pk_lcdm,
+            })
+        np.testing.assert_allclose(top.get_ydata(), 0.95 * self.pk_lcdm)
+
+
+class TestPlotPowerSpectraUpdateWithObservations:
+    """Test the observed ratio points follow a ΛCDM update."""
+
+    def setup_method(self):
+        self.k = np.logspace(-4, 1, 50)
+        self.pk_lcdm = 1e4 * (self.k / 0.01) ** (-2.5)
+        self.k_obs = np.logspace(-0.5, 0.5, 10)
+        self.Pk_obs = 0.9 * 1e4 * (self.k_obs / 0.01) ** (-2.5)
+        self.Pk_obs_err = 0.1 * self.Pk_obs
+        model_results = {'ΛCDM': self.pk_lcdm, 'wCDM (w0=-0.9)': 0.95 * self.pk_lcdm}
+        self.fig = plot_power_spectra(self.k, model_results, self.k_obs, self.Pk_obs,
+                                      self.Pk_obs_err, save_path=None)
+        self.expected_ratio = self.Pk_obs / np.interp(self.k_obs, self.k, self.pk_lcdm)
+
+    def teardown_method(self):
+        plt.close(self.fig)
+
+    def obs_ratio(self):
+        """(points, error bar half-heights) of the ratio panel's observations."""
+        (container,) = self.fig.axes[1].containers
+        data_line, _, (bars,) = container.lines
+        segments = np.array(bars.get_segments())
+        return data_line.get_ydata(), (segments[:, 1, 1] - segments[:, 0, 1]) / 2
+
+    def test_lcdm_update_redraws_observed_ratio(self):
+        n_lines = [len(ax.get_lines()) for ax in self.fig.axes]
+        np.testing.assert_allclose(self.obs_ratio()[0], self.expected_ratio)
+
+        plot_power_spectra_update(self.fig, {'ΛCDM': 2 * self.pk_lcdm})
+
+        points, errors = self.obs_ratio()
+        np.testing.assert_allclose(points, self.expected_ratio / 2)
+        np.testing.assert_allclose(errors, 0.1 * self.expected_ratio / 2)
+        np.testing.assert_allclose(lines_by_gid(self.fig, 'wCDM (w0=-0.9)')[1].get_ydata(),
+                                   0.475)
+        assert [len(ax.get_lines()) for ax in self.fig.axes] == n_lines
+
+    def test_model_update_keeps_observed_ratio(self):
+        plot_power_spectra_update(self.fig, {'wCDM (w0=-0.9)': 0.8 * self.pk_lcdm})
+        np.testing.assert_allclose(self.obs_ratio()[0], self.expected_ratio)
+
+
+class TestPlotSuppressionRatiosUpdate:
+    """Test plot_suppression_ratios_update reuses the reference line and bands."""
+
+    def setup_method(self):
+        self.k = np.logspace(-3, 1, 100)
+        self.fig = plot_suppression_ratios(self.k, {'wCDM (w0=-0.9)': 0.95 * np.ones_like(self.k)},
+                                           save_path=None)
+
+    def teardown_method(self):
+        plt.close(self.fig)
+
+    def test_updates_model_line_in_place(self):
+        ax = self.fig.axes[0]
+        line = lines_by_gid(self.fig, 'wCDM (w0=-0.9)')[0]
+        artists = list(ax.get_lines()) + list(ax.patches)
+
+        result = plot_suppression_ratios_update(self.fig,
+                                                {'wCDM (w0=-0.9)': 0.7 * np.ones_like(self.k)})
+
+        assert result is self.fig
+        assert lines_by_gid(self.fig, 'wCDM (w0=-0.9)') == [line]
+        np.testing.assert_allclose(line.get_ydata(), 0.7)
+        # axhline reference and both axhspan bands are kept, nothing is added
+        assert list(ax.get_lines()) + list(ax.patches) == artists
+
+    def test_missing_model_raises(self):
+        line = lines_by_gid(self.fig, 'wCDM (w0=-0.9)')[0]
+        with pytest.raises(ValueError, match='Thermal WDM'):
+            plot_suppression_ratios_update(self.fig, {
+                'wCDM (w0=-0.9)': 0.7 * np.ones_like(self.k),
+                'Thermal WDM (all DM, m=3 keV)': 0.5 * np.ones_like(self.k),
+            })
+        np.testing.assert_allclose(line.get_ydata(), 0.95)
+
+
+class TestLogDecimation:
+    """Test dense k grids are thinned to the figure's pixel width."""
+
+    def setup_method(self):
+        self.fig = plt.figure(figsize=(9, 10))
+        self.npix = int(9 * self.fig.dpi)
+
+    def teardown_method(self):
+        plt.close('all')
+
+    def test_short_grid_is_not_thinned(self):
+        k = np.logspace(-4, 1, 4 * self.npix)
+        assert _log_decimation_index(k, self.fig) == slice(None)
+
+    def test_dense_grid_thinned_to_two_points_per_pixel(self):
+        k = np.logspace(-4, 1, 20 * self.npix)
+        k_thin = k[_log_decimation_index(k, self.fig)]
+        assert 1.9 * self.npix <= len(k_thin) <= 2 * self.npix
+        assert k_thin[0] == k[0] and k_thin[-1] == k[-1]
+
+    def test_non_positive_k_is_not_thinned(self):
+        k = np.logspace(-4, 1, 20 * self.npix)
+        k[0] = 0.0
+        assert _log_decimation_index(k, self.fig) == slice(None)
+
+    def test_non_monotonic_k_is_not_thinned(self):
+        k = np.logspace(-4, 1, 20 * self.npix)
+        k[10], k[11] = k[11], k[10]
+        assert _log_decimation_index(k, self.fig) == slice(None)
+
+    def test_update_applies_same_index(self):
+        k = np.logspace(-4, 1, 20 * self.npix)
+        pk_lcdm = 1e4 * (k / 0.01) ** (-2.5)
+        fig = plot_power_spectra(k, {'ΛCDM': pk_lcdm, 'wCDM (w0=-0.9)': 0.95 * pk_lcdm},
+                                 None, None, None, save_path=None)
+        top, ratio = lines_by_gid(fig, 'wCDM (w0=-0.9)')
+        k_plot = top.get_xdata()
+        assert len(k_plot) <= 2 * self.npix
+
+        plot_power_spectra_update(fig, {'wCDM (w0=-0.9)': 0.8 * pk_lcdm})
+
+        np.testing.assert_allclose(top.get_ydata(), 0.8e4 * (k_plot / 0.01) ** (-2.5))
+        np.testing.assert_allclose(ratio.get_ydata(), 0.8)
+
+    def test_dense_list_grid(self):
+        """Lists (as from MCP JSON) longer than 4x npix can take the decimation index."""
+        k = np.logspace(-4, 1, 20 * self.npix)
+        pk_lcdm = 1e4 * (k / 0.01) ** (-2.5)
+        fig = plot_power_spectra(k.tolist(), {'ΛCDM': pk_lcdm.tolist()},
+                                 None, None, None, save_path=None)
+        (top,) = lines_by_gid(fig, 'ΛCDM')
+        assert len(top.get_xdata()) <= 2 * self.npix
+
+        plot_power_spectra_update(fig, {'ΛCDM': (2 * pk_lcdm).tolist()})
+
+        np.testing.assert_allclose(top.get_ydata(), 2e4 * (top.get_xdata() / 0.01) ** (-2.5))
+
+
+class TestSafeRatio:
+    """Test _safe_ratio masks non-positive denominators."""
+
+    def test_zero_and_negative_denominators_give_nan(self):
+        result = _safe_ratio(np.array([1.0, 1.0, 1.0, 3.0]), np.array([2.0, 0.0, -1.0, 3.0]))
+        np.testing.assert_array_equal(result, [0.5, np.nan, np.nan, 1.0])
+
+    def test_broadcasts_against_reference(self):
+        num = np.array([[2.0, 4.0], [1.0, 1.0]])
+        result = _safe_ratio(num, np.array([2.0, 0.0]))
+        np.testing.assert_array_equal(result, [[1.0, np.nan], [0.5, np.nan]])
+
+    def test_out_may_alias_denominator(self):
+        """plot_power_spectra reuses the interpolated ΛCDM buffer for the errors."""
+        den = np.array([2.0, 0.0, -1.0, 4.0])
+        result = _safe_ratio(np.array([1.0, 1.0, 1.0, 1.0]), den, out=den)
+        assert result is den
+        np.testing.assert_array_equal(den, [0.5, np.nan, np.nan, 0.25])
+
+
+class TestCloseAfterSave:
+    """Test close_after_save drops the figure from pyplot once it is written."""
+
+    def setup_method(self):
+        plt.close('all')
+        self.k = np.logspace(-3, 1, 50)
+        pk_lcdm = 1e4 * (self.k / 0.01) ** (-2.5)
+        self.model_results = {'ΛCDM': pk_lcdm, 'wCDM (w0=-0.9)': 0.95 * pk_lcdm}
+        self.ratios = {'wCDM (w0=-0.9)': 0.95 * np.ones_like(self.k)}
+        self.outdir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        plt.close('all')
+
+    @pytest.mark.parametrize('plot', [
+        lambda self, path: plot_power_spectra(self.k, self.model_results, None, None, None,
+                                              save_path=path, close_after_save=True),
+        lambda self, path: plot_suppression_ratios(self.k, self.ratios,
+                                                   save_path=path, close_after_save=True),
+        lambda self, path: plot_model_comparison_grid(self.k, self.model_results,
+                                                      save_path=path, close_after_save=True),
+        lambda self, path: plot_scale_dependent_effects(self.k, self.model_results,
+                                                        save_path=path, close_after_save=True),
+    ], ids=['power_spectra', 'suppression_ratios', 'model_comparison_grid',
+            'scale_dependent_effects'])
+    def test_figure_closed_and_none_returned(self, plot):
+        path = os.path.join(self.outdir, 'plot.png')
+        assert plot(self, path) is None
+        assert os.path.exists(path)
+        assert plt.get_fignums() == []
+
+    def test_figure_kept_by_default(self):
+        path = os.path.join(self.outdir, 'plot.png')
+        fig = plot_suppression_ratios(self.k, self.ratios, save_path=path)
+        assert plt.get_fignums() == [fig.number]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
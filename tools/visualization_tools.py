@@ -39,7 +39,6 @@ def plot_power_spectra(k_theory: str, model_results: str, k_obs: str, Pk_obs: st
     Returns:
         str: Absolute path to saved plot PNG file
     """
-    import matplotlib.pyplot as plt
     from mcp_utils import get_output_path
 
     if save_path is not None:
@@ -57,8 +56,8 @@ def plot_power_spectra(k_theory: str, model_results: str, k_obs: str, Pk_obs: st
     Pk_obs_err_data = session.get_dataset(Pk_obs_err)
 
     from codes.viz import plot_power_spectra as plot_pk
-    fig = plot_pk(k_theory_data, model_results_data, k_obs_data, Pk_obs_data, Pk_obs_err_data, final_path)
-    plt.close(fig)
+    plot_pk(k_theory_data, model_results_data, k_obs_data, Pk_obs_data, Pk_obs_err_data, final_path,
+            close_after_save=True)
     return f"Plot saved to: {final_path}"
 
 @tool
@@ -95,7 +94,6 @@ def plot_suppression_ratios(k_values: str, suppression_ratios: str, reference_mo
     Returns:
         str: Absolute path to saved plot PNG file
     """
-    import matplotlib.pyplot as plt
     from mcp_utils import get_output_path
 
     if save_path is not None:
@@ -110,6 +108,5 @@ def plot_suppression_ratios(k_values: str, suppression_ratios: str, reference_mo
     ratios_data = session.get_dataset(suppression_ratios)
 
     from codes.viz import plot_suppression_ratios as plot_suppression
-    fig = plot_suppression(k_data, ratios_data, reference_model, final_path)
-    plt.close(fig)
+    plot_suppression(k_data, ratios_data, reference_model, final_path, close_after_save=True)
     return f"Plot saved to: {final_path}"
\ No newline at end of file